@@ -0,0 +1,110 @@
+"""历史记录行构建耗时基准测试
+
+对比改用共享资源缓存前后（每行新建 QIcon、逐个按钮 setStyleSheet）构建每一行的耗时：
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_row_render.py --rows 1000 10000
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PyQt6.QtCore import Qt, QSize, QEvent
+from PyQt6.QtGui import QIcon
+from PyQt6.QtWidgets import QApplication, QHBoxLayout, QLabel, QListWidgetItem, QPushButton, QVBoxLayout, QWidget
+from loguru import logger
+
+from clipboard_manager import ClipboardMonitor
+from models import ContentType
+from storage import MemoryStorage
+from ui import ClipboardHistoryWidget
+
+def legacy_add_history_item(self, item):
+    """改动前的 _add_history_item，用作对照组"""
+    list_item = QListWidgetItem()
+    list_item.setData(Qt.ItemDataRole.UserRole, item.id)
+    widget = QWidget()
+    layout = QHBoxLayout(widget)
+    content_widget = QWidget()
+    content_layout = QVBoxLayout(content_widget)
+    if item.is_pinned:
+        list_item.setBackground(Qt.GlobalColor.lightGray)
+    content_label = QLabel(self._get_preview_text(item))
+    content_label.setWordWrap(True)
+    content_layout.addWidget(content_label)
+    meta_label = QLabel(f'类型: {item.content_type.value} | '
+                        f'时间: {item.created_at.strftime("%Y-%m-%d %H:%M:%S")} | '
+                        f'分类: {item.category.name if item.category else "未分类"}')
+    meta_label.setStyleSheet('color: gray; font-size: 10px;')
+    content_layout.addWidget(meta_label)
+    layout.addWidget(content_widget, stretch=1)
+    button_widget = QWidget()
+    button_layout = QHBoxLayout(button_widget)
+    copy_btn = QPushButton()
+    copy_btn.setIcon(QIcon('icons/icons8-copy-48.png'))
+    pin_btn = QPushButton()
+    pin_btn.setIcon(QIcon('icons/icons8-unpin-100.png' if item.is_pinned else 'icons/icons8-pin-48.png'))
+    delete_btn = QPushButton()
+    delete_btn.setIcon(QIcon('icons/icons8-delete-button-48.png'))
+    for btn in [copy_btn, pin_btn, delete_btn]:
+        btn.setFixedSize(32, 32)
+        btn.setStyleSheet('padding: 4px;')
+        btn.setIconSize(btn.size() - QSize(8, 8))
+    button_layout.addWidget(copy_btn)
+    button_layout.addWidget(pin_btn)
+    button_layout.addWidget(delete_btn)
+    button_layout.setSpacing(4)
+    item_id = item.id
+    copy_btn.clicked.connect(lambda: self.copy_item(item_id))
+    pin_btn.clicked.connect(lambda: self.pin_item(item_id))
+    delete_btn.clicked.connect(lambda: self.delete_item(item_id))
+    layout.addWidget(button_widget)
+    widget.setLayout(layout)
+    list_item.setSizeHint(widget.sizeHint())
+    self.history_list.addItem(list_item)
+    self.history_list.setItemWidget(list_item, widget)
+
+
+def measure(widget: ClipboardHistoryWidget, add_row, items) -> float:
+    """返回每行的平均构建耗时（微秒）"""
+    widget.history_list.clear()
+    # 确保上一轮的行控件已真正销毁，不影响本轮计时
+    QApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+    QApplication.processEvents()
+    start = time.perf_counter()
+    for item in items:
+        add_row(widget, item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='历史记录行构建耗时基准测试')
+    parser.add_argument('--rows', type=int, nargs='*', default=[1000, 10000], help='构建的行数')
+    args = parser.parse_args()
+
+    # 图标使用相对路径，需在仓库根目录下运行
+    os.chdir(ROOT)
+    logger.remove()
+    app = QApplication(sys.argv)
+
+    storage = MemoryStorage()
+    for i in range(max(args.rows)):
+        storage.add_item(f'clipboard entry #{i} ' * 5, ContentType.TEXT, 'bench-device', '文本')
+    monitor = ClipboardMonitor(app.clipboard(), storage)
+    widget = ClipboardHistoryWidget(app.clipboard(), monitor)
+    widget.resize(800, 600)
+    all_items = storage.list_items(limit=None)
+
+    print(f"{'行数':<8}{'版本':<10}{'构建/行':>12}")
+    for count in args.rows:
+        items = all_items[:count]
+        for label, add_row in (('改动前', legacy_add_history_item),
+                               ('资源缓存', ClipboardHistoryWidget._add_history_item)):
+            print(f'{count:<8}{label:<10}{measure(widget, add_row, items):>10.0f}µs')
+    widget.history_list.clear()
+
+
+if __name__ == '__main__':
+    main()
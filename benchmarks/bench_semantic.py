@@ -0,0 +1,60 @@
+"""语义索引基准测试
+
+写入指定条数的合成记录后测量 top-k 查询延迟：
+    python benchmarks/bench_semantic.py --items 200000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loguru import logger
+
+from semantic_index import SemanticIndex, DEFAULT_DIM
+
+WORDS = ['select', 'users', 'from', 'where', 'import', 'def', 'class', 'http', 'clipboard', 'order',
+         'query', 'limit', 'join', 'orders', 'customer', 'invoice', 'meeting', 'notes', 'report',
+         'deploy', 'server', 'config', 'password', 'reset', 'email', 'address', 'phone', 'budget',
+         '剪贴板', '历史', '记录', '会议', '纪要', '用户', '增长', '天气', '公园', '报告', '预算']
+QUERIES = ['sql query about users', 'meeting notes budget', '用户增长报告', 'server config deploy',
+           'customer invoice email']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='语义索引基准测试')
+    parser.add_argument('--items', type=int, default=200000, help='写入的记录条数')
+    parser.add_argument('--dim', type=int, default=DEFAULT_DIM, help='向量维度')
+    parser.add_argument('--k', type=int, default=50, help='每次查询返回的条数')
+    parser.add_argument('--repeat', type=int, default=20, help='每个查询的重复次数')
+    args = parser.parse_args()
+
+    logger.remove()
+    rng = random.Random(42)
+    items = [(i, ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 40)))) for i in range(args.items)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = SemanticIndex(os.path.join(tmp_dir, 'index'), dim=args.dim)
+        start = time.perf_counter()
+        index.add_many(items)
+        elapsed = time.perf_counter() - start
+        print(f'写入 {args.items} 条: {elapsed:.1f}s ({elapsed / args.items * 1e6:.0f}µs/条)')
+
+        index.query(QUERIES[0], args.k)  # 预热，将内存映射的数据读入页缓存
+        latencies = []
+        for query in QUERIES:
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                index.query(query, args.k)
+                latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        print(f'top-{args.k} 查询: 中位数 {latencies[len(latencies) // 2] * 1000:.1f}ms, '
+              f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f}ms')
+        del index
+
+
+if __name__ == '__main__':
+    main()
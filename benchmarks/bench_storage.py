@@ -0,0 +1,94 @@
+"""存储后端基准测试
+
+对 STORAGE_BACKENDS 中的每个后端执行相同的工作负载并输出各操作耗时：
+    python benchmarks/bench_storage.py --items 10000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loguru import logger
+
+from models import ContentType
+from storage import STORAGE_BACKENDS, ORDER_MOST_USED, create_storage
+
+CATEGORIES = {
+    ContentType.TEXT: '文本',
+    ContentType.CODE: '代码片段',
+    ContentType.URL: 'URLs',
+}
+
+
+def make_workload(count: int, seed: int = 42):
+    """生成固定的记录序列，保证各后端使用完全相同的输入"""
+    rng = random.Random(seed)
+    words = ['select', 'users', 'from', 'where', 'import', 'def', 'class', 'http', 'clipboard',
+             'hello', 'world', '剪贴板', '历史', '记录', 'query', 'order', 'by', 'limit']
+    workload = []
+    for i in range(count):
+        content_type = rng.choice(list(CATEGORIES))
+        content = ' '.join(rng.choice(words) for _ in range(rng.randint(3, 30))) + f' #{i}'
+        workload.append((content, content_type))
+    return workload
+
+
+def timed(results: dict, name: str, func, *args):
+    start = time.perf_counter()
+    value = func(*args)
+    results[name] = time.perf_counter() - start
+    return value
+
+
+def run_backend(backend: str, workload, options: dict) -> dict:
+    storage = create_storage(backend, **options)
+    results = {}
+
+    def add_all():
+        return [storage.add_item(content, content_type, 'bench-device', CATEGORIES[content_type]).id
+                for content, content_type in workload]
+
+    ids = timed(results, 'add', add_all)
+    sample = random.Random(0).sample(ids, min(200, len(ids)))
+    timed(results, 'get x200', lambda: [storage.get_item(i) for i in sample])
+    timed(results, 'pin x200', lambda: [storage.set_pinned(i, True) for i in sample])
+    timed(results, 'list x100', lambda: [storage.list_items(50) for _ in range(100)])
+    timed(results, 'category x10', lambda: [storage.list_by_category('代码片段') for _ in range(10)])
+    timed(results, 'search x20', lambda: [storage.search('users where', 50) for _ in range(20)])
+    usage = [(item_id, 'bench-device', datetime.now()) for item_id in random.Random(1).choices(ids, k=1000)]
+    timed(results, 'usage x1000', lambda: [storage.record_usage(usage[i:i + 100]) for i in range(0, 1000, 100)])
+    timed(results, 'most used x100', lambda: [storage.list_items(50, ORDER_MOST_USED) for _ in range(100)])
+    timed(results, 'unpin x200', lambda: [storage.set_pinned(i, False) for i in sample])
+    timed(results, 'delete x200', lambda: [storage.delete_item(i, 'bench-device') for i in sample])
+    timed(results, 'clear', storage.clear_all, 'bench-device')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='存储后端基准测试')
+    parser.add_argument('--items', type=int, default=10000, help='写入的记录条数')
+    parser.add_argument('--backends', nargs='*', default=list(STORAGE_BACKENDS), help='参与测试的后端')
+    args = parser.parse_args()
+
+    logger.remove()
+    workload = make_workload(args.items)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        options = {
+            'sqlite': {'db_url': f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"},
+        }
+        all_results = {backend: run_backend(backend, workload, options.get(backend, {}))
+                       for backend in args.backends}
+
+    operations = list(next(iter(all_results.values())))
+    print(f"{'操作':<16}" + ''.join(f'{backend:>12}' for backend in all_results))
+    for operation in operations:
+        print(f'{operation:<16}' + ''.join(f'{all_results[b][operation] * 1000:>10.1f}ms' for b in all_results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import Counter
+from typing import Optional, List, Iterable
+
+import numpy as np
+
+# 分块大小：最小 4KB，平均约 16KB，最大 64KB
+MIN_CHUNK_SIZE = 4 * 1024
+AVG_CHUNK_BITS = 14
+MAX_CHUNK_SIZE = 64 * 1024
+# 滚动哈希的窗口长度（字节）
+WINDOW_SIZE = 48
+# 每次向量化计算滚动哈希的数据段长度，临时数组的内存只与段长有关，与数据总长无关
+BLOCK_SIZE = 4 * MAX_CHUNK_SIZE
+
+# 每个字节值对应的随机权重，由 SHA-256 推导，保证所有设备上完全一致
+# 窗口和按 2^32 取模累加，低 AVG_CHUNK_BITS 位不受溢出影响
+_GEAR = np.array([int.from_bytes(hashlib.sha256(bytes([i])).digest()[:4], 'big') for i in range(256)],
+                 dtype=np.uint32)
+_MASK = np.uint32((1 << AVG_CHUNK_BITS) - 1)
+
+
+def chunk_digest(data: bytes) -> str:
+    """分块的内容地址"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _candidates(data: bytes) -> np.ndarray:
+    """逐段计算滚动哈希，返回全部候选边界（边界之前的字节数），升序"""
+    view = np.frombuffer(data, dtype=np.uint8)
+    parts = []
+    for start in range(0, len(data), BLOCK_SIZE):
+        stop = min(len(data), start + BLOCK_SIZE)
+        # 段首向前多取 WINDOW_SIZE 个字节，使段内每个窗口都完整
+        base = max(0, start - WINDOW_SIZE)
+        prefix = np.zeros(stop - base + 1, dtype=np.uint32)
+        np.cumsum(_GEAR[view[base:stop]], dtype=np.uint32, out=prefix[1:])
+        # 以第 end 个字节结尾的窗口之和，边界在该字节之后
+        ends = np.arange(max(WINDOW_SIZE, start + 1), stop + 1)
+        local = ends - base
+        window_sums = prefix[local] - prefix[local - WINDOW_SIZE]
+        parts.append(ends[(window_sums & _MASK) == 0])
+    return np.concatenate(parts)
+
+
+def split_chunks(data: bytes) -> List[bytes]:
+    """按内容定义的边界切分数据
+
+    滚动哈希取最近 WINDOW_SIZE 个字节权重之和，低 AVG_CHUNK_BITS 位全为0处作为候选边界，
+    边界只取决于窗口内的内容，插入或删除数据只会影响附近的分块。
+    哈希按 BLOCK_SIZE 分段用前缀和向量化计算，再在候选边界中按最小、最大分块大小挑选切点。
+    """
+    if len(data) <= MIN_CHUNK_SIZE:
+        return [data] if data else []
+    candidates = _candidates(data)
+
+    cuts = []
+    start = 0
+    while len(data) - start > MIN_CHUNK_SIZE:
+        index = int(np.searchsorted(candidates, start + MIN_CHUNK_SIZE, side='left'))
+        if index < len(candidates) and candidates[index] - start <= MAX_CHUNK_SIZE:
+            cut = int(candidates[index])
+        elif len(data) - start > MAX_CHUNK_SIZE:
+            cut = start + MAX_CHUNK_SIZE
+        else:
+            break
+        if cut >= len(data):
+            break
+        cuts.append(cut)
+        start = cut
+    bounds = [0] + cuts + [len(data)]
+    return [data[bounds[i]:bounds[i + 1]] for i in range(len(bounds) - 1)]
+
+
+class ChunkStore:
+    """按内容地址保存分块，path 为空时只保存在内存中
+
+    写入磁盘时先写临时文件再原子替换，传输中断不会留下不完整的分块，已保存的分块可在续传时直接复用。
+    每条记录通过 retain 登记引用的分块，release 后不再被任何记录引用的分块会被删除。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._chunks: dict[str, bytes] = {}
+        # 引用方（记录的来源标识）-> 分块地址列表，以及由此汇总的各分块引用计数
+        self._refs: dict[str, List[str]] = {}
+        self._ref_counts: Counter = Counter()
+        if path:
+            os.makedirs(path, exist_ok=True)
+            if os.path.exists(self._refs_file()):
+                with open(self._refs_file(), 'r') as f:
+                    self._refs = json.load(f)
+                for digests in self._refs.values():
+                    self._ref_counts.update(set(digests))
+
+    def _refs_file(self) -> str:
+        return os.path.join(self.path, 'refs.json')
+
+    def _file(self, digest: str) -> str:
+        return os.path.join(self.path, digest[:2], digest)
+
+    def has(self, digest: str) -> bool:
+        if not self.path:
+            return digest in self._chunks
+        return os.path.exists(self._file(digest))
+
+    def get(self, digest: str) -> bytes:
+        if not self.path:
+            return self._chunks[digest]
+        with open(self._file(digest), 'rb') as f:
+            return f.read()
+
+    def put(self, data: bytes, digest: Optional[str] = None) -> str:
+        """保存分块并返回内容地址，给出 digest 时会校验内容是否一致"""
+        actual = chunk_digest(data)
+        if digest is not None and digest != actual:
+            raise ValueError(f"分块校验失败: 期望 {digest}，实际 {actual}")
+        self._write(actual, data)
+        return actual
+
+    def _write(self, digest: str, data: bytes):
+        if self.has(digest):
+            return
+        if not self.path:
+            with self._lock:
+                self._chunks[digest] = data
+            return
+        target = self._file(digest)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, target)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def put_all(self, data: bytes, owner: Optional[str] = None) -> List[str]:
+        """切分数据并保存全部分块，返回分块地址列表
+
+        给出 owner 时先登记引用再写入，避免写入期间被并发的 release 当作无引用的分块删除。
+        """
+        chunks = split_chunks(data)
+        digests = [chunk_digest(chunk) for chunk in chunks]
+        if owner is not None:
+            self.retain({owner: digests})
+        for digest, chunk in zip(digests, chunks):
+            self._write(digest, chunk)
+        return digests
+
+    def assemble(self, digests: List[str]) -> bytes:
+        """按地址列表拼接出完整数据"""
+        return b''.join(self.get(digest) for digest in digests)
+
+    def retain(self, refs: dict[str, List[str]]):
+        """登记各引用方引用的分块，引用方已登记时忽略"""
+        with self._lock:
+            added = {owner: digests for owner, digests in refs.items() if owner not in self._refs}
+            if not added:
+                return
+            for owner, digests in added.items():
+                self._refs[owner] = digests
+                self._ref_counts.update(set(digests))
+            self._save_refs()
+
+    def release(self, owners: Iterable[str]) -> int:
+        """解除引用方的引用，删除不再被引用的分块，返回删除的分块数"""
+        with self._lock:
+            orphans = []
+            for owner in owners:
+                digests = self._refs.pop(owner, None)
+                if digests is None:
+                    continue
+                for digest in set(digests):
+                    self._ref_counts[digest] -= 1
+                    if self._ref_counts[digest] <= 0:
+                        del self._ref_counts[digest]
+                        orphans.append(digest)
+            if not orphans:
+                return 0
+            for digest in orphans:
+                self._remove(digest)
+            self._save_refs()
+        return len(orphans)
+
+    def _remove(self, digest: str):
+        if not self.path:
+            self._chunks.pop(digest, None)
+            return
+        try:
+            os.remove(self._file(digest))
+        except FileNotFoundError:
+            pass
+
+    def _save_refs(self):
+        if not self.path:
+            return
+        fd, temp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self._refs, f)
+        os.replace(temp_path, self._refs_file())
@@ -1,27 +1,39 @@
 import hashlib
 import json
 import os
+import time
 import uuid
 from datetime import datetime
 from typing import Optional, List
 
 from PyQt6.QtCore import QObject, pyqtSignal
 from PyQt6.QtGui import QClipboard, QImage
-from sqlalchemy.orm import Session
-from sqlalchemy import text
 from loguru import logger
 
 from models import ClipboardItem, ContentType, Category
+from storage import StorageBackend, ORDER_RECENT
+from semantic_index import SemanticIndex
+from purger import UNDO_WINDOW_SECONDS
+from usage_recorder import UsageRecorder
+from profiler import PROFILER
+
+# 重建语义索引时每批加入的记录数，每批结束后释放索引锁
+REBUILD_BATCH_SIZE = 500
 
 class ClipboardMonitor(QObject):
     content_changed = pyqtSignal(ClipboardItem)
 
-    def __init__(self, clipboard: QClipboard, session: Session):
+    def __init__(self, clipboard: QClipboard, storage: StorageBackend,
+                 semantic_index: Optional[SemanticIndex] = None,
+                 usage_recorder: Optional[UsageRecorder] = None):
         super().__init__()
         self.clipboard = clipboard
-        self.session = session
+        self.storage = storage
+        self.semantic_index = semantic_index
+        self.usage_recorder = usage_recorder
         self.device_id = self._get_device_id()
         self.is_copying_selected = False  # 添加标记
+        self._undo_batch: Optional[tuple[str, float]] = None  # 最近一次删除的批次ID和删除时间
         self._setup_clipboard_monitoring()
 
     def _get_device_id(self) -> str:
@@ -54,24 +66,19 @@ class ClipboardMonitor(QObject):
 
             logger.info(f"检测到剪贴板内容变化，类型: {content_type.value}")
 
-            # 创建新的剪贴板记录
-            item = ClipboardItem(
-                content=content,
-                content_type=content_type,
-                device_id=self.device_id
-            )
-
             # 智能分类
-            category = self._categorize_content(content, content_type)
-            if category:
-                item.category = category
-                logger.info(f"内容已分类为: {category.name}")
-
-            # 保存到数据库
-            self.session.add(item)
-            self.session.commit()
+            category_name = self._categorize_content(content, content_type)
+            if category_name:
+                logger.info(f"内容已分类为: {category_name}")
+
+            # 保存到存储后端
+            item = self.storage.add_item(content, content_type, self.device_id, category_name)
             logger.info("剪贴板内容已保存到数据库")
 
+            # 加入语义索引（图片内容是文件路径，不参与语义搜索）
+            if self.semantic_index is not None and content_type != ContentType.IMAGE:
+                self.semantic_index.add(item.id, content)
+
             # 发送信号通知UI更新
             self.content_changed.emit(item)
 
@@ -80,11 +87,14 @@ class ClipboardMonitor(QObject):
     def get_item_by_id(self, item_id: int) -> Optional[ClipboardItem]:
         """根据ID获取剪贴板记录"""
         try:
-            item = self.session.query(ClipboardItem).filter(ClipboardItem.id == item_id).first()
-            return item
+            return self.storage.get_item(item_id)
         except Exception as e:
             logger.error(f"获取剪贴板记录时出错: {str(e)}")
             return None
+    def record_copy(self, item_id: int):
+        """记录一次复用，由后台线程异步写入"""
+        if self.usage_recorder is not None:
+            self.usage_recorder.record(item_id, self.device_id)
     def _get_clipboard_content(self) -> tuple[str, ContentType]:
         """获取剪贴板内容和类型"""
         mime_data = self.clipboard.mimeData()
@@ -127,7 +137,7 @@ class ClipboardMonitor(QObject):
             'var ', 'let ', 'const ', '</', '/>'
         ]
         return any(indicator in text for indicator in code_indicators)
-    def _categorize_content(self, content: str, content_type: ContentType) -> Optional[Category]:
+    def _categorize_content(self, content: str, content_type: ContentType) -> Optional[str]:
         """智能分类内容"""
         # 根据内容类型进行分类
         type_based_categories = {
@@ -138,50 +148,13 @@ class ClipboardMonitor(QObject):
             ContentType.OTHER: '其他'
         }
 
-        if content_type in type_based_categories:
-            category_name = type_based_categories[content_type]
-            category = self.session.query(Category).filter(Category.name == category_name).first()
-            if not category:
-                category = Category(name=category_name)
-                self.session.add(category)
-                self.session.commit()
-            return category
+        return type_based_categories.get(content_type)
 
-        return None
-
-    def get_history(self, limit: int = 50) -> List[ClipboardItem]:
-        """获取剪贴板历史记录"""
+    def get_history(self, limit: int = 50, order: str = ORDER_RECENT) -> List[ClipboardItem]:
+        """获取剪贴板历史记录，order 为 ORDER_RECENT 或 ORDER_MOST_USED"""
         try:
-            logger.info(f"获取最近 {limit} 条历史记录")
-            # 先获取置顶项
-            pinned_items = self.session.query(ClipboardItem.id, ClipboardItem.content, ClipboardItem.content_type,
-                                      ClipboardItem.created_at, ClipboardItem.device_id, ClipboardItem.category_id,
-                                      ClipboardItem.is_pinned, ClipboardItem.last_accessed)\
-                .filter(ClipboardItem.is_pinned == True)\
-                .order_by(ClipboardItem.last_accessed.desc())\
-                .all()
-            
-            # 再获取非置顶项
-            unpinned_items = self.session.query(ClipboardItem.id, ClipboardItem.content, ClipboardItem.content_type,
-                                      ClipboardItem.created_at, ClipboardItem.device_id, ClipboardItem.category_id,
-                                      ClipboardItem.is_pinned, ClipboardItem.last_accessed)\
-                .filter(ClipboardItem.is_pinned == False)\
-                .order_by(ClipboardItem.created_at.desc())\
-                .limit(limit)\
-                .all()
-            
-            # 合并结果
-            result = pinned_items + unpinned_items
-            return [ClipboardItem(
-                id=row.id,
-                content=row.content,
-                content_type=row.content_type,
-                created_at=row.created_at,
-                device_id=row.device_id,
-                category_id=row.category_id,
-                is_pinned=row.is_pinned,
-                last_accessed=row.last_accessed
-            ) for row in result]
+            logger.info(f"获取 {limit} 条历史记录，排序方式: {order}")
+            return self.storage.list_items(limit, order)
         except Exception as e:
             logger.error(f"获取历史记录时出错: {str(e)}")
             return []
@@ -189,50 +162,79 @@ class ClipboardMonitor(QObject):
     def get_by_category(self, category_name: str) -> List[ClipboardItem]:
         """按分类获取剪贴板记录"""
         try:
-            # 先查询Category的ID
-            category = self.session.query(Category.id)\
-                .filter(Category.name == category_name)\
-                .first()
-            if not category:
-                return []
-            
-            # 再查询关联的ClipboardItem
-            # 先获取置顶项
-            pinned_items = self.session.query(ClipboardItem)\
-                .filter(ClipboardItem.category_id == category.id)\
-                .filter(ClipboardItem.is_pinned == True)\
-                .order_by(ClipboardItem.last_accessed.desc())\
-                .all()
-            
-            # 再获取非置顶项
-            unpinned_items = self.session.query(ClipboardItem)\
-                .filter(ClipboardItem.category_id == category.id)\
-                .filter(ClipboardItem.is_pinned == False)\
-                .order_by(ClipboardItem.created_at.desc())\
-                .all()
-            
-            result = pinned_items + unpinned_items
-            return [ClipboardItem(
-                id=row.id,
-                content=row.content,
-                content_type=row.content_type,
-                created_at=row.created_at,
-                device_id=row.device_id,
-                category_id=row.category_id,
-                is_pinned=row.is_pinned,
-                last_accessed=row.last_accessed
-            ) for row in result]
+            return self.storage.list_by_category(category_name)
         except Exception as e:
             logger.error(f"按分类获取剪贴板记录时出错: {str(e)}")
             return []
-            
+
+    def get_categories(self) -> List[Category]:
+        """获取全部分类"""
+        try:
+            return self.storage.list_categories()
+        except Exception as e:
+            logger.error(f"获取分类时出错: {str(e)}")
+            return []
+
+    def search(self, keyword: str, limit: int = 50) -> List[ClipboardItem]:
+        """按关键词搜索剪贴板记录"""
+        try:
+            return self.storage.search(keyword, limit)
+        except Exception as e:
+            logger.error(f"搜索剪贴板记录时出错: {str(e)}")
+            return []
+
+    def semantic_search(self, query: str, limit: int = 50) -> List[ClipboardItem]:
+        """按语义相似度搜索剪贴板记录，最相似的在前"""
+        if self.semantic_index is None:
+            return []
+        try:
+            hits = self.semantic_index.query(query, limit)
+            # 已软删除的记录仍在索引中，get_item 会将其过滤掉
+            items = [self.storage.get_item(item_id) for item_id, _ in hits]
+            return [item for item in items if item is not None]
+        except Exception as e:
+            logger.error(f"语义搜索时出错: {str(e)}")
+            return []
+
+    def rebuild_semantic_index(self) -> int:
+        """用存储中的全部记录填充语义索引，返回加入的条数
+
+        记录较多时耗时较长，应在后台线程中调用；分批加入，期间新复制的内容仍可及时写入索引。
+        """
+        if self.semantic_index is None:
+            return 0
+        try:
+            count = 0
+            with PROFILER.thread_scope():
+                texts = self.storage.list_texts()
+                for start in range(0, len(texts), REBUILD_BATCH_SIZE):
+                    count += self.semantic_index.add_many(texts[start:start + REBUILD_BATCH_SIZE])
+            logger.info(f"语义索引已重建，共 {count} 条记录")
+            return count
+        except Exception as e:
+            logger.error(f"重建语义索引时出错: {str(e)}")
+            return 0
+
+    def toggle_pin(self, item_id: int) -> Optional[bool]:
+        """切换置顶状态，返回新的置顶状态，失败时返回None"""
+        try:
+            item = self.storage.get_item(item_id)
+            if not item:
+                return None
+            pinned = not item.is_pinned
+            self.storage.set_pinned(item_id, pinned)
+            logger.info(f"{'置顶' if pinned else '取消置顶'}记录: {item_id}")
+            return pinned
+        except Exception as e:
+            logger.error(f"切换置顶状态时出错: {str(e)}")
+            return None
+
     def delete_item(self, item_id: int) -> bool:
-        """删除指定的剪贴板记录"""
+        """删除指定的剪贴板记录，可在撤销时限内恢复"""
         try:
-            item = self.session.query(ClipboardItem).filter(ClipboardItem.id == item_id).first()
-            if item:
-                self.session.delete(item)
-                self.session.commit()
+            batch_id = self.storage.delete_item(item_id, self.device_id)
+            if batch_id:
+                self._undo_batch = (batch_id, time.monotonic())
                 logger.info(f"已从数据库中删除记录: {item_id}")
                 return True
             return False
@@ -240,13 +242,32 @@ class ClipboardMonitor(QObject):
             logger.error(f"删除剪贴板记录时出错: {str(e)}")
             return False
     def clear_all_history(self):
-        """清空所有剪贴板历史记录"""
+        """清空所有剪贴板历史记录，可在撤销时限内恢复"""
         try:
             logger.info("正在清空所有剪贴板历史记录")
-            self.session.query(ClipboardItem).delete()
-            self.session.commit()
+            batch_id = self.storage.clear_all(self.device_id)
+            if batch_id:
+                self._undo_batch = (batch_id, time.monotonic())
             logger.info("已成功清空所有剪贴板历史记录")
         except Exception as e:
             logger.error(f"清空历史记录时出错: {str(e)}")
-            self.session.rollback()
-            return False
\ No newline at end of file
+            return False
+
+    def can_undo(self) -> bool:
+        """最近一次删除是否仍在撤销时限内"""
+        return self._undo_batch is not None and \
+            time.monotonic() - self._undo_batch[1] < UNDO_WINDOW_SECONDS
+
+    def undo_delete(self) -> int:
+        """撤销最近一次删除，返回恢复的条数"""
+        if not self.can_undo():
+            return 0
+        try:
+            batch_id, _ = self._undo_batch
+            self._undo_batch = None
+            count = self.storage.restore(batch_id)
+            logger.info(f"已撤销删除，恢复 {count} 条记录")
+            return count
+        except Exception as e:
+            logger.error(f"撤销删除时出错: {str(e)}")
+            return 0
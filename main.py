@@ -1,13 +1,20 @@
+import os
 import sys
+import threading
 from PyQt6.QtWidgets import QApplication, QMainWindow, QSystemTrayIcon, QMenu
-from PyQt6.QtGui import QIcon, QAction
+from PyQt6.QtGui import QAction
 from PyQt6.QtCore import Qt
 from loguru import logger
-from sqlalchemy.orm import sessionmaker
+from dotenv import load_dotenv
 
-from models import init_db
+from storage import create_storage, MemoryStorage
+from semantic_index import SemanticIndex
 from ui import ClipboardHistoryWidget
 from clipboard_manager import ClipboardMonitor
+from purger import TombstonePurger
+from usage_recorder import UsageRecorder
+from profiler import PROFILER
+import resources
 
 # 增加递归深度限制
 sys.setrecursionlimit(3000)
@@ -60,19 +67,41 @@ class ClipboardManager(QMainWindow):
             }
         """)
         # 设置窗口图标
-        icon = QIcon('icons/icons8-clipboard-48.png')
-        self.setWindowIcon(icon)
+        self.setWindowIcon(resources.icon('clipboard'))
         
-        # 初始化数据库
-        logger.info("初始化数据库连接")
-        engine = init_db('sqlite:///clipboards.db', echo=True)
-        Session = sessionmaker(bind=engine)
-        self.session = Session()
+        # 初始化存储后端
+        logger.info("初始化存储后端")
+        self.storage = create_storage()
+
+        # 启动后台清理线程，物理删除超过撤销时限的记录
+        self.purger = TombstonePurger(self.storage)
+        QApplication.instance().aboutToQuit.connect(self.purger.stop)
+
+        # 初始化语义索引，内存存储后端时索引也只保存在内存中；
+        # 索引记录所属的数据库，切换 CLIPBOARD_DB_URL 后旧索引会被丢弃并重建
+        logger.info("初始化语义索引")
+        if isinstance(self.storage, MemoryStorage):
+            self.semantic_index = SemanticIndex()
+        else:
+            self.semantic_index = SemanticIndex(os.getenv('CLIPBOARD_SEMANTIC_INDEX', 'semantic_index'),
+                                                source=self.storage.source)
+        self.purger.add_listener(lambda items: self.semantic_index.remove(item.id for item in items))
+        self.purger.start()
+
+        # 启动使用记录线程，复制操作的统计异步写入
+        self.usage_recorder = UsageRecorder(self.storage)
+        self.usage_recorder.start()
+        QApplication.instance().aboutToQuit.connect(self.usage_recorder.stop)
         
         # 初始化剪贴板监控
         logger.info("初始化剪贴板监控")
         self.clipboard = QApplication.clipboard()
-        self.monitor = ClipboardMonitor(self.clipboard, self.session)
+        self.monitor = ClipboardMonitor(self.clipboard, self.storage, self.semantic_index,
+                                        self.usage_recorder)
+        if len(self.semantic_index) == 0:
+            # 首次启动或升级后索引为空，在后台线程中重建，不阻塞界面
+            threading.Thread(target=self.monitor.rebuild_semantic_index, name='SemanticIndexBuilder',
+                             daemon=True).start()
         
         self.setup_ui()
         self.setup_tray()
@@ -89,17 +118,25 @@ class ClipboardManager(QMainWindow):
     def setup_tray(self):
         # 创建系统托盘图标
         self.tray_icon = QSystemTrayIcon(self)
-        icon = QIcon('icons/icons8-clipboard-48.png')
-        self.tray_icon.setIcon(icon)
+        self.tray_icon.setIcon(resources.icon('clipboard'))
 
         # 创建托盘菜单
         tray_menu = QMenu()
         show_action = QAction('显示主窗口', self)
         show_action.triggered.connect(self.show)
+        self.start_profile_action = QAction('开始性能分析', self)
+        self.start_profile_action.triggered.connect(self._start_profiling)
+        self.stop_profile_action = QAction('停止性能分析并保存报告', self)
+        self.stop_profile_action.triggered.connect(self._stop_profiling)
+        self.stop_profile_action.setEnabled(False)
         quit_action = QAction('退出', self)
         quit_action.triggered.connect(QApplication.quit)
 
         tray_menu.addAction(show_action)
+        tray_menu.addSeparator()
+        tray_menu.addAction(self.start_profile_action)
+        tray_menu.addAction(self.stop_profile_action)
+        tray_menu.addSeparator()
         tray_menu.addAction(quit_action)
 
         self.tray_icon.setContextMenu(tray_menu)
@@ -107,6 +144,20 @@ class ClipboardManager(QMainWindow):
         self.tray_icon.activated.connect(self._handle_tray_activation)
         self.tray_icon.show()
 
+    def _start_profiling(self):
+        # 开始采集界面线程和工作线程的性能数据
+        PROFILER.start()
+        self.start_profile_action.setEnabled(False)
+        self.stop_profile_action.setEnabled(True)
+
+    def _stop_profiling(self):
+        # 停止采集并写入带时间戳的报告
+        path = PROFILER.stop()
+        self.start_profile_action.setEnabled(True)
+        self.stop_profile_action.setEnabled(False)
+        if path:
+            self.tray_icon.showMessage('性能分析', f'报告已保存到 {path}')
+
     def _handle_tray_activation(self, reason):
         # 当用户左键单击托盘图标时显示窗口
         if reason == QSystemTrayIcon.ActivationReason.Trigger:
@@ -118,6 +169,7 @@ class ClipboardManager(QMainWindow):
         self.hide()
 
 def main():
+    load_dotenv()
     logger.add("clipboard.log", rotation="10 MB")
     app = QApplication(sys.argv)
     window = ClipboardManager()
@@ -36,6 +36,115 @@ def migrate_add_is_pinned():
         else:
             print("is_pinned字段已存在")
 
+def migrate_add_deleted_at():
+    """添加deleted_at字段到clipboard_items表，并创建tombstones表"""
+    # 连接到数据库
+    engine = create_engine('sqlite:///clipboards.db')
+    
+    with engine.connect() as conn:
+        # 检查是否已存在deleted_at字段
+        result = conn.execute(text("""SELECT name FROM pragma_table_info('clipboard_items') WHERE name='deleted_at'"""))
+        if not result.fetchone():
+            # 添加deleted_at字段，为空表示未删除
+            conn.execute(text("""ALTER TABLE clipboard_items ADD COLUMN deleted_at DATETIME"""))
+            conn.execute(text("""CREATE INDEX IF NOT EXISTS ix_clipboard_items_deleted_at ON clipboard_items (deleted_at)"""))
+            conn.commit()
+            print("成功添加deleted_at字段")
+        else:
+            print("deleted_at字段已存在")
+
+    # 创建tombstones表
+    init_db('sqlite:///clipboards.db')
+
+def migrate_add_restored_at():
+    """添加restored_at字段到tombstones表，撤销删除时保留墓碑并记录撤销时间"""
+    # 连接到数据库
+    engine = create_engine('sqlite:///clipboards.db')
+    
+    with engine.connect() as conn:
+        # 检查是否已存在restored_at字段
+        result = conn.execute(text("""SELECT name FROM pragma_table_info('tombstones') WHERE name='restored_at'"""))
+        if not result.fetchone():
+            conn.execute(text("""ALTER TABLE tombstones ADD COLUMN restored_at DATETIME"""))
+            conn.execute(text("""CREATE INDEX IF NOT EXISTS ix_tombstones_restored_at ON tombstones (restored_at)"""))
+            conn.commit()
+            print("成功添加restored_at字段")
+        else:
+            print("restored_at字段已存在")
+
+def migrate_add_origin_index():
+    """为clipboard_items表和tombstones表添加来源索引，用于多设备同步去重"""
+    # 连接到数据库
+    engine = create_engine('sqlite:///clipboards.db')
+    
+    with engine.connect() as conn:
+        conn.execute(text("""CREATE INDEX IF NOT EXISTS ix_clipboard_items_origin ON clipboard_items (device_id, created_at)"""))
+        conn.execute(text("""CREATE INDEX IF NOT EXISTS ix_tombstones_origin ON tombstones (item_device_id, item_created_at)"""))
+        conn.commit()
+        print("成功添加ix_clipboard_items_origin和ix_tombstones_origin索引")
+
+def migrate_add_autoincrement():
+    """将clipboard_items表的主键改为AUTOINCREMENT，物理删除后ID不再被复用
+
+    SQLite 不支持修改主键，需新建表复制数据后替换，依赖 migrate_add_deleted_at 添加的字段和tombstones表。
+    整个重建在一个显式事务中执行，失败时回滚，不会留下迁移了一半的数据库。
+    """
+    # 连接到数据库，关闭驱动的自动事务管理，改为显式 BEGIN/COMMIT，使建表等DDL语句也能回滚
+    engine = create_engine('sqlite:///clipboards.db', isolation_level='AUTOCOMMIT')
+    
+    with engine.connect() as conn:
+        # 检查建表语句中是否已有AUTOINCREMENT
+        result = conn.execute(text("""SELECT sql FROM sqlite_master WHERE type='table' AND name='clipboard_items'"""))
+        if 'AUTOINCREMENT' in result.scalar().upper():
+            print("clipboard_items表已使用AUTOINCREMENT")
+            return
+        # 检查前置迁移是否已执行
+        result = conn.execute(text("""SELECT name FROM pragma_table_info('clipboard_items') WHERE name='deleted_at'"""))
+        if not result.fetchone():
+            print("缺少deleted_at字段，请先执行migrate_add_deleted_at")
+            return
+        result = conn.execute(text("""SELECT name FROM sqlite_master WHERE type='table' AND name='tombstones'"""))
+        if not result.fetchone():
+            print("缺少tombstones表，请先执行migrate_add_deleted_at")
+            return
+
+        columns = 'id, content, content_type, created_at, device_id, category_id, is_pinned, last_accessed, deleted_at'
+        conn.execute(text("""BEGIN"""))
+        try:
+            # 清理之前失败的迁移可能留下的临时表
+            conn.execute(text("""DROP TABLE IF EXISTS clipboard_items_new"""))
+            conn.execute(text("""CREATE TABLE clipboard_items_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                content VARCHAR NOT NULL,
+                content_type VARCHAR(5) NOT NULL,
+                created_at DATETIME,
+                device_id VARCHAR(36) NOT NULL,
+                category_id INTEGER REFERENCES categories (id),
+                is_pinned INTEGER NOT NULL DEFAULT 0,
+                last_accessed DATETIME,
+                deleted_at DATETIME
+            )"""))
+            conn.execute(text(f"""INSERT INTO clipboard_items_new ({columns}) SELECT {columns} FROM clipboard_items"""))
+            conn.execute(text("""DROP TABLE clipboard_items"""))
+            conn.execute(text("""ALTER TABLE clipboard_items_new RENAME TO clipboard_items"""))
+            # 已物理删除的记录ID也不能再分配，序号从现有记录和墓碑中的最大ID开始
+            conn.execute(text("""DELETE FROM sqlite_sequence WHERE name='clipboard_items'"""))
+            conn.execute(text("""INSERT INTO sqlite_sequence (name, seq) SELECT 'clipboard_items', MAX(
+                (SELECT IFNULL(MAX(id), 0) FROM clipboard_items),
+                (SELECT IFNULL(MAX(item_id), 0) FROM tombstones))"""))
+            conn.execute(text("""CREATE INDEX IF NOT EXISTS ix_clipboard_items_deleted_at ON clipboard_items (deleted_at)"""))
+            conn.execute(text("""CREATE INDEX IF NOT EXISTS ix_clipboard_items_origin ON clipboard_items (device_id, created_at)"""))
+            conn.execute(text("""COMMIT"""))
+        except Exception:
+            conn.execute(text("""ROLLBACK"""))
+            raise
+        print("成功将clipboard_items表改为AUTOINCREMENT")
+
 if __name__ == '__main__':
     #migrate_add_is_pinned()
-    migrate_add_last_accessed()
\ No newline at end of file
+    #migrate_add_last_accessed()
+    # 以下迁移有先后依赖，需按顺序执行；已执行过的会自动跳过
+    migrate_add_deleted_at()
+    migrate_add_restored_at()
+    migrate_add_origin_index()
+    migrate_add_autoincrement()
\ No newline at end of file
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from enum import Enum
@@ -33,6 +33,47 @@ class ClipboardItem(Base):
     category = relationship('Category', back_populates='items', lazy='joined')
     is_pinned = Column(Integer, default=0, nullable=False)  # 置顶标记，0表示未置顶，1表示置顶
     last_accessed = Column(DateTime, default=datetime.now, onupdate=datetime.now)  # 最后访问时间
+    deleted_at = Column(DateTime, index=True)  # 软删除时间，为空表示未删除
+    # 来源设备和创建时间跨设备唯一标识一条记录，同步时据此去重
+    # 使用 AUTOINCREMENT，物理删除后ID不会被新记录复用，避免使用统计、语义索引等按ID关联的数据错配
+    __table_args__ = (Index('ix_clipboard_items_origin', 'device_id', 'created_at'),
+                      {'sqlite_autoincrement': True})
+
+class Tombstone(Base):
+    """删除记录（墓碑），用于撤销删除、后台清理和多设备同步"""
+    __tablename__ = 'tombstones'
+
+    id = Column(Integer, primary_key=True)
+    item_id = Column(Integer, nullable=False, index=True)
+    # 原记录的来源设备和创建时间，跨设备唯一标识被删除的记录
+    item_device_id = Column(String(36), nullable=False)
+    item_created_at = Column(DateTime, nullable=False)
+    deleted_by = Column(String(36), nullable=False)  # 执行删除的设备
+    deleted_at = Column(DateTime, nullable=False, index=True)
+    batch_id = Column(String(36), nullable=False, index=True)  # 同一次删除操作共用，撤销时按批次恢复
+    purged_at = Column(DateTime, index=True)  # 物理删除时间，为空表示仍可撤销
+    restored_at = Column(DateTime, index=True)  # 撤销删除的时间，为空表示删除仍然有效；撤销后保留墓碑以同步给其他设备
+    # 同步导入前按来源检查记录是否已在本机删除
+    __table_args__ = (Index('ix_tombstones_origin', 'item_device_id', 'item_created_at'),)
+
+class UsageEvent(Base):
+    """记录被复用（复制回剪贴板）的事件，只追加不修改"""
+    __tablename__ = 'usage_events'
+
+    id = Column(Integer, primary_key=True)
+    item_id = Column(Integer, nullable=False, index=True)
+    device_id = Column(String(36), nullable=False)
+    used_at = Column(DateTime, nullable=False)
+
+class ItemUsage(Base):
+    """按记录汇总的使用次数，由使用事件批量累加"""
+    __tablename__ = 'item_usage'
+
+    item_id = Column(Integer, ForeignKey('clipboard_items.id'), primary_key=True)
+    use_count = Column(Integer, default=0, nullable=False)
+    last_used_at = Column(DateTime, nullable=False)
+    # “最常用”排序直接按此索引倒序扫描，无需聚合事件表
+    __table_args__ = (Index('ix_item_usage_rank', 'use_count', 'last_used_at'),)
 
 def init_db(db_url, echo=False):
     """初始化数据库"""
@@ -0,0 +1,134 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+from loguru import logger
+
+REPORT_DIR = 'profiles'
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+# Python 3.12 起 cProfile 基于 sys.monitoring，一个 Profile 即可覆盖所有线程，且同一时间只能启用一个
+_SHARED_PROFILE = sys.version_info >= (3, 12)
+
+
+class ProfilerSession:
+    """按需性能分析：cProfile 统计界面线程和工作线程的耗时，tracemalloc 统计内存分配
+
+    未开启时不安装任何钩子，工作线程的 thread_scope 只做一次标志位判断。
+    """
+
+    def __init__(self, report_dir: str = REPORT_DIR):
+        self.report_dir = report_dir
+        self._lock = threading.Lock()
+        self._active = False
+        self._started_at: Optional[datetime] = None
+        self._owner: Optional[str] = None  # 调用 start 的线程，其 Profile 在整个分析期间保持启用
+        self._profiles: dict[str, cProfile.Profile] = {}
+        self._start_snapshot: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    def start(self):
+        """开始分析，需在界面线程中调用"""
+        with self._lock:
+            if self._active:
+                return
+            self._started_at = datetime.now()
+            self._profiles = {}
+            tracemalloc.start()
+            self._start_snapshot = tracemalloc.take_snapshot()
+            profile = cProfile.Profile()
+            self._owner = threading.current_thread().name
+            self._profiles[self._owner] = profile
+            self._active = True
+            profile.enable()
+        logger.info("性能分析已开始")
+
+    def stop(self) -> Optional[str]:
+        """停止分析并写入报告，返回报告路径，未在分析时返回None"""
+        with self._lock:
+            if not self._active:
+                return None
+            self._active = False
+            self._profiles[self._owner].disable()
+            # 在锁内换出本次的数据，写报告时工作线程不会再向其中添加条目
+            profiles, self._profiles = self._profiles, {}
+            start_snapshot, self._start_snapshot = self._start_snapshot, None
+            started_at = self._started_at
+            end_snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        try:
+            path = self._write_report(started_at, profiles, start_snapshot, end_snapshot)
+            logger.info(f"性能分析报告已保存到: {path}")
+            return path
+        except Exception as e:
+            logger.error(f"写入性能分析报告时出错: {str(e)}")
+            return None
+
+    @contextmanager
+    def thread_scope(self):
+        """包裹工作线程中的一个工作单元，分析开启时统计该单元在本线程中的耗时"""
+        if not self._active or _SHARED_PROFILE:
+            yield
+            return
+        name = threading.current_thread().name
+        if name == self._owner:
+            yield
+            return
+        with self._lock:
+            # 不加锁的判断之后分析可能已经停止，需在锁内再次确认
+            profile = self._profiles.setdefault(name, cProfile.Profile()) if self._active else None
+        if profile is None:
+            yield
+            return
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+
+    def _write_report(self, started_at: datetime, profiles: dict[str, cProfile.Profile],
+                      start_snapshot: tracemalloc.Snapshot, end_snapshot: tracemalloc.Snapshot) -> str:
+        os.makedirs(self.report_dir, exist_ok=True)
+        stamp = started_at.strftime('%Y%m%d_%H%M%S')
+        base = os.path.join(self.report_dir, f'profile_{stamp}')
+        duration = (datetime.now() - started_at).total_seconds()
+
+        out = io.StringIO()
+        out.write(f'性能分析报告 {started_at:%Y-%m-%d %H:%M:%S}，时长 {duration:.1f} 秒\n')
+        for name, profile in profiles.items():
+            # 同时保存原始数据，便于用 snakeviz 等工具查看
+            profile.dump_stats(f'{base}_{name}.prof')
+            title = '全部线程' if _SHARED_PROFILE else f'线程 {name}'
+            for sort_key in ('cumulative', 'tottime'):
+                out.write(f'\n===== {title}：按 {sort_key} 排序 =====\n')
+                pstats.Stats(profile, stream=out).sort_stats(sort_key).print_stats(TOP_FUNCTIONS)
+
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__),)
+        end_snapshot = end_snapshot.filter_traces(ignore)
+        out.write(f'\n===== 内存分配最多的 {TOP_ALLOCATIONS} 处 =====\n')
+        for stat in end_snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+            out.write(f'{stat}\n')
+        out.write(f'\n===== 分析期间内存增长最多的 {TOP_ALLOCATIONS} 处 =====\n')
+        start_snapshot = start_snapshot.filter_traces(ignore)
+        for stat in end_snapshot.compare_to(start_snapshot, 'lineno')[:TOP_ALLOCATIONS]:
+            out.write(f'{stat}\n')
+
+        path = f'{base}.txt'
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(out.getvalue())
+        return path
+
+
+# 全局分析会话，供托盘菜单和各工作线程共用
+PROFILER = ProfilerSession()
@@ -0,0 +1,91 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from loguru import logger
+
+from models import ClipboardItem, ContentType
+from profiler import PROFILER
+from storage import StorageBackend
+
+# 删除后可撤销的时长（秒），超过后由后台线程物理删除
+UNDO_WINDOW_SECONDS = 10
+IMAGE_DIR = 'clipboard_images'
+
+
+class TombstonePurger(threading.Thread):
+    """后台清理线程：定期物理删除超过撤销时限的软删除记录及其图片文件
+
+    每批最多 batch_size 条记录，各批使用独立的短事务，避免长时间占用数据库写锁。
+    """
+
+    def __init__(self, storage: StorageBackend, undo_window: float = UNDO_WINDOW_SECONDS,
+                 interval: float = 5.0, batch_size: int = 200):
+        super().__init__(name='TombstonePurger', daemon=True)
+        self.storage = storage
+        self.undo_window = undo_window
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop_event = threading.Event()
+        self._listeners: List[Callable[[List[ClipboardItem]], None]] = []
+
+    def add_listener(self, callback: Callable[[List[ClipboardItem]], None]):
+        """注册回调，每批记录被物理删除后调用，用于清理索引等派生数据（在后台线程中执行）"""
+        self._listeners.append(callback)
+
+    def run(self):
+        logger.info("后台清理线程已启动")
+        while not self._stop_event.wait(self.interval):
+            with PROFILER.thread_scope():
+                self.purge_once()
+
+    def stop(self):
+        """停止清理线程"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout=self.interval)
+
+    def purge_once(self) -> int:
+        """清理当前所有超过撤销时限的记录，返回清理的条数"""
+        cutoff = datetime.now() - timedelta(seconds=self.undo_window)
+        total = 0
+        while not self._stop_event.is_set():
+            try:
+                items = self.storage.purge_deleted(cutoff, self.batch_size)
+            except Exception as e:
+                logger.error(f"清理已删除记录时出错: {str(e)}")
+                break
+            if not items:
+                break
+
+            self._remove_blobs(items)
+            for callback in self._listeners:
+                try:
+                    callback(items)
+                except Exception as e:
+                    logger.error(f"执行清理回调时出错: {str(e)}")
+
+            total += len(items)
+            if len(items) < self.batch_size:
+                break
+
+        if total:
+            logger.info(f"已物理删除 {total} 条记录")
+        return total
+
+    def _remove_blobs(self, items: List[ClipboardItem]):
+        """删除图片记录对应的文件，只处理图片目录下的文件"""
+        image_dir = os.path.abspath(IMAGE_DIR)
+        for item in items:
+            if item.content_type != ContentType.IMAGE:
+                continue
+            path = os.path.abspath(item.content)
+            if os.path.dirname(path) != image_dir:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"删除图片文件 {path} 时出错: {str(e)}")
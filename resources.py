@@ -0,0 +1,68 @@
+import os
+from typing import List
+
+from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtGui import QGuiApplication, QIcon, QPixmap
+
+ICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'icons')
+ICON_FILES = {
+    'clipboard': 'icons8-clipboard-48.png',
+    'copy': 'icons8-copy-48.png',
+    'pin': 'icons8-pin-48.png',
+    'unpin': 'icons8-unpin-100.png',
+    'delete': 'icons8-delete-button-48.png',
+}
+
+# 历史记录每行操作按钮的尺寸
+ROW_BUTTON_SIZE = QSize(32, 32)
+ROW_ICON_SIZE = ROW_BUTTON_SIZE - QSize(8, 8)
+
+# 列表行内控件的样式，合并到列表所在窗口的样式表中，各行只需设置 objectName
+ROW_BUTTON_NAME = 'rowButton'
+META_LABEL_NAME = 'metaLabel'
+ROW_STYLE = f"""
+    QPushButton#{ROW_BUTTON_NAME} {{
+        padding: 4px;
+    }}
+    QLabel#{META_LABEL_NAME} {{
+        color: gray;
+        font-size: 10px;
+    }}
+"""
+
+_icons: dict[str, QIcon] = {}
+
+
+def _pixel_ratios() -> List[float]:
+    """需要预先生成的设备像素比：普通屏、2倍屏以及当前主屏"""
+    ratios = {1.0, 2.0}
+    screen = QGuiApplication.primaryScreen()
+    if screen:
+        ratios.add(screen.devicePixelRatio())
+    return sorted(ratios)
+
+
+def _load_icon(name: str) -> QIcon:
+    source = QPixmap(os.path.join(ICON_DIR, ICON_FILES[name]))
+    icon = QIcon(source)
+    # 预先缩放出行内按钮用到的各倍率位图，绘制时无需再解码和缩放
+    for ratio in _pixel_ratios():
+        pixmap = source.scaled(ROW_ICON_SIZE * ratio, Qt.AspectRatioMode.KeepAspectRatio,
+                               Qt.TransformationMode.SmoothTransformation)
+        pixmap.setDevicePixelRatio(ratio)
+        icon.addPixmap(pixmap)
+    return icon
+
+
+def icon(name: str) -> QIcon:
+    """获取共享的图标，首次使用时加载，需在创建 QApplication 之后调用"""
+    cached = _icons.get(name)
+    if cached is None:
+        cached = _icons[name] = _load_icon(name)
+    return cached
+
+
+def preload_icons():
+    """预加载全部图标"""
+    for name in ICON_FILES:
+        icon(name)
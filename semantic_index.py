@@ -0,0 +1,240 @@
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+from typing import Optional, List, Iterable, Tuple
+
+import numpy as np
+from loguru import logger
+
+DEFAULT_DIM = 256
+# 每条记录参与向量化的最大字符数，避免超长内容拖慢入库
+MAX_TEXT_LENGTH = 10000
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def _features(text: str) -> Counter:
+    """提取特征：英文/数字词本身及其字符三元组，中文等非ASCII词的单字和相邻双字"""
+    features = Counter()
+    for token in _TOKEN_RE.findall(text[:MAX_TEXT_LENGTH].lower()):
+        if token.isascii():
+            features['w:' + token] += 1
+            padded = f'<{token}>'
+            for i in range(len(padded) - 2):
+                features['c:' + padded[i:i + 3]] += 1
+        else:
+            for i, char in enumerate(token):
+                features['u:' + char] += 1
+                if i + 1 < len(token):
+                    features['b:' + token[i:i + 2]] += 1
+    return features
+
+
+class SemanticIndex:
+    """基于哈希特征 TF-IDF 的本地语义索引
+
+    每条记录入库时按当前的 IDF 计算归一化向量，存入（可选内存映射的）NumPy 矩阵，
+    查询时对全部向量做一次矩阵乘法得到余弦相似度。纯 CPU 计算，不依赖网络和GPU。
+    path 为空时索引只保存在内存中。source 标识索引对应的数据源（如数据库），
+    与已保存索引记录的数据源不一致时丢弃旧索引，由调用方按空索引重建。
+    """
+
+    def __init__(self, path: Optional[str] = None, dim: int = DEFAULT_DIM, initial_capacity: int = 1024,
+                 source: Optional[str] = None):
+        if dim < 8 or dim & (dim - 1):
+            raise ValueError(f"向量维度必须是不小于8的2的幂: {dim}")
+        self.path = path
+        self.dim = dim
+        self.source = source
+        self._lock = threading.Lock()
+        self.count = 0  # 已使用的行数（含已移除的空行）
+        self.n_docs = 0  # 当前有效的记录数
+        self._df = np.zeros(dim, dtype=np.float64)
+        if path and os.path.exists(os.path.join(path, 'meta.json')) and self._same_source():
+            self._load()
+        else:
+            self._vectors, self._ids, self._masks = self._allocate(initial_capacity)
+            # 立即写入元数据，避免旧的 meta.json 与新分配的空文件不一致
+            self._save_meta()
+        self._rows = {int(item_id): row for row, item_id in enumerate(self._ids[:self.count]) if item_id >= 0}
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _allocate(self, capacity: int, suffix: str = ''):
+        """分配向量、ID和特征维度位图三个数组，位图记录每行出现过的维度，用于移除时回退文档频率"""
+        if not self.path:
+            return (np.zeros((capacity, self.dim), dtype=np.float32), np.full(capacity, -1, dtype=np.int64),
+                    np.zeros((capacity, self.dim // 8), dtype=np.uint8))
+        os.makedirs(self.path, exist_ok=True)
+        vectors = np.lib.format.open_memmap(self._file('vectors.npy' + suffix), mode='w+',
+                                            dtype=np.float32, shape=(capacity, self.dim))
+        ids = np.lib.format.open_memmap(self._file('ids.npy' + suffix), mode='w+',
+                                        dtype=np.int64, shape=(capacity,))
+        masks = np.lib.format.open_memmap(self._file('masks.npy' + suffix), mode='w+',
+                                          dtype=np.uint8, shape=(capacity, self.dim // 8))
+        ids[:] = -1
+        return vectors, ids, masks
+
+    def _same_source(self) -> bool:
+        with open(self._file('meta.json'), 'r') as f:
+            saved = json.load(f).get('source')
+        if saved != self.source:
+            logger.warning(f"语义索引属于其他数据源 {saved}，当前为 {self.source}，将重建索引")
+            return False
+        return True
+
+    def _load(self):
+        with open(self._file('meta.json'), 'r') as f:
+            meta = json.load(f)
+        if meta['dim'] != self.dim:
+            raise ValueError(f"索引维度 {meta['dim']} 与配置的维度 {self.dim} 不一致")
+        self.count = meta['count']
+        self.n_docs = meta['n_docs']
+        self._df = np.load(self._file('df.npy'))
+        self._vectors = np.load(self._file('vectors.npy'), mmap_mode='r+')
+        self._ids = np.load(self._file('ids.npy'), mmap_mode='r+')
+        if not os.path.exists(self._file('masks.npy')):
+            # 旧版本的索引没有位图，只能从向量的非零维度推断
+            logger.warning("语义索引缺少特征位图，按向量的非零维度重新生成")
+            masks = np.lib.format.open_memmap(self._file('masks.npy'), mode='w+',
+                                              dtype=np.uint8, shape=(len(self._ids), self.dim // 8))
+            masks[:] = np.packbits(self._vectors[:] != 0, axis=1)
+            masks.flush()
+            del masks
+        self._masks = np.load(self._file('masks.npy'), mmap_mode='r+')
+        logger.info(f"已加载语义索引，共 {self.n_docs} 条记录")
+
+    def _save_meta(self):
+        if not self.path:
+            return
+        self._vectors.flush()
+        self._ids.flush()
+        self._masks.flush()
+        np.save(self._file('df.npy'), self._df)
+        with open(self._file('meta.json'), 'w') as f:
+            json.dump({'dim': self.dim, 'count': self.count, 'n_docs': self.n_docs, 'source': self.source}, f)
+
+    def _grow(self, needed: int):
+        """容量不足时按倍数扩容，内存映射文件通过写入新文件后替换实现"""
+        capacity = len(self._ids)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        vectors, ids, masks = self._allocate(capacity, suffix='.tmp' if self.path else '')
+        vectors[:self.count] = self._vectors[:self.count]
+        ids[:self.count] = self._ids[:self.count]
+        masks[:self.count] = self._masks[:self.count]
+        if self.path:
+            vectors.flush()
+            ids.flush()
+            masks.flush()
+            # 先释放旧的映射，再替换文件
+            del self._vectors, self._ids, self._masks, vectors, ids, masks
+            for name in ('vectors.npy', 'ids.npy', 'masks.npy'):
+                os.replace(self._file(name + '.tmp'), self._file(name))
+            self._vectors = np.load(self._file('vectors.npy'), mmap_mode='r+')
+            self._ids = np.load(self._file('ids.npy'), mmap_mode='r+')
+            self._masks = np.load(self._file('masks.npy'), mmap_mode='r+')
+        else:
+            self._vectors, self._ids, self._masks = vectors, ids, masks
+
+    def _hash(self, features: Counter) -> Tuple[np.ndarray, np.ndarray]:
+        """将特征哈希到固定维度，返回各维度的索引和带符号的词频权重"""
+        indices = np.empty(len(features), dtype=np.int64)
+        weights = np.empty(len(features), dtype=np.float32)
+        mask = self.dim - 1
+        for i, (feature, count) in enumerate(features.items()):
+            h = zlib.crc32(feature.encode('utf-8'))
+            indices[i] = h & mask
+            # 用哈希值的最高位作为符号，减小哈希冲突带来的偏差
+            weights[i] = (1.0 + math.log(count)) * (-1.0 if h & 0x80000000 else 1.0)
+        return indices, weights
+
+    def _idf(self) -> np.ndarray:
+        return (np.log((1.0 + self.n_docs) / (1.0 + self._df)) + 1.0).astype(np.float32)
+
+    def _vectorize(self, indices: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        np.add.at(vector, indices, weights)
+        vector *= self._idf()
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def add_many(self, items: Iterable[Tuple[int, str]]) -> int:
+        """批量加入记录，已存在的ID会被覆盖，返回加入的条数"""
+        added = 0
+        with self._lock:
+            for item_id, text in items:
+                features = _features(text)
+                if not features:
+                    continue
+                if item_id in self._rows:
+                    self._remove_row(self._rows.pop(item_id))
+                indices, weights = self._hash(features)
+                # 先更新文档频率，再按更新后的IDF计算本条向量
+                present = np.zeros(self.dim, dtype=bool)
+                present[indices] = True
+                self.n_docs += 1
+                self._df[present] += 1
+                self._grow(self.count + 1)
+                self._masks[self.count] = np.packbits(present)
+                self._vectors[self.count] = self._vectorize(indices, weights)
+                self._ids[self.count] = item_id
+                self._rows[item_id] = self.count
+                self.count += 1
+                added += 1
+            if added:
+                self._save_meta()
+        return added
+
+    def add(self, item_id: int, text: str) -> bool:
+        """加入一条记录"""
+        return self.add_many([(item_id, text)]) == 1
+
+    def _remove_row(self, row: int):
+        # 按位图回退文档频率；不能用向量的非零维度，符号相反的特征哈希到同一维度时会相互抵消为0
+        self._df[np.unpackbits(self._masks[row]).astype(bool)] -= 1
+        np.maximum(self._df, 0, out=self._df)
+        self._masks[row] = 0
+        self._vectors[row] = 0
+        self._ids[row] = -1
+        self.n_docs -= 1
+
+    def remove(self, item_ids: Iterable[int]) -> int:
+        """移除记录，返回移除的条数"""
+        removed = 0
+        with self._lock:
+            for item_id in item_ids:
+                row = self._rows.pop(item_id, None)
+                if row is not None:
+                    self._remove_row(row)
+                    removed += 1
+            if removed:
+                self._save_meta()
+        return removed
+
+    def query(self, text: str, k: int = 50) -> List[Tuple[int, float]]:
+        """返回与 text 最相似的 k 条记录的 (ID, 余弦相似度)，按相似度降序"""
+        features = _features(text)
+        if not features or not self.n_docs:
+            return []
+        with self._lock:
+            query = self._vectorize(*self._hash(features))
+            scores = self._vectors[:self.count] @ query
+            k = min(k, self.count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            ids = self._ids[top]
+        return [(int(item_id), float(scores[row])) for row, item_id in zip(top, ids)
+                if item_id >= 0 and scores[row] > 0]
@@ -0,0 +1,782 @@
+import bisect
+import os
+import threading
+import uuid
+from datetime import datetime
+from functools import wraps
+from itertools import islice, chain
+from collections import Counter
+from typing import Optional, List, Tuple, Protocol, runtime_checkable
+
+from sqlalchemy import select, insert, update, delete, literal, func, or_, DateTime, String
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import sessionmaker
+from loguru import logger
+
+from models import ClipboardItem, ContentType, Category, Tombstone, UsageEvent, ItemUsage, init_db
+
+DEFAULT_DB_URL = 'sqlite:///clipboards.db'
+
+# 非置顶项的排序方式：按创建时间倒序，或按使用次数倒序（从未被复用的记录排在最后，按创建时间倒序）
+ORDER_RECENT = 'recent'
+ORDER_MOST_USED = 'most_used'
+
+# 使用事件：(记录ID, 设备ID, 使用时间)
+UsageRecord = Tuple[int, str, datetime]
+
+
+@runtime_checkable
+class StorageBackend(Protocol):
+    """剪贴板记录存储后端接口"""
+
+    def add_item(self, content: str, content_type: ContentType, device_id: str,
+                 category_name: Optional[str] = None, created_at: Optional[datetime] = None) -> ClipboardItem:
+        """新增一条记录，category_name 不存在时自动创建分类，created_at 为空时取当前时间"""
+        ...
+
+    def get_item(self, item_id: int) -> Optional[ClipboardItem]:
+        """根据ID获取记录"""
+        ...
+
+    def find_by_origin(self, device_id: str, created_at: datetime) -> Optional[ClipboardItem]:
+        """按来源设备和创建时间查找记录，用于多设备同步时去重"""
+        ...
+
+    def list_added_since(self, after_id: Optional[int] = None) -> List[ClipboardItem]:
+        """获取ID大于 after_id 的全部记录（不含已删除的），按ID升序
+
+        ID只增不减（物理删除后也不复用），可作为本机的同步游标，同步导入的较早记录也会被取到。
+        """
+        ...
+
+    def has_tombstone(self, device_id: str, created_at: datetime) -> bool:
+        """本机是否删除过该来源的记录（已撤销的删除不算），用于多设备同步时避免重新导入已删除的记录"""
+        ...
+
+    def list_texts(self) -> List[Tuple[int, str]]:
+        """获取全部未删除的非图片记录的 (ID, 内容)，用于重建索引，会在后台线程中调用"""
+        ...
+
+    def list_items(self, limit: Optional[int] = 50, order: str = ORDER_RECENT) -> List[ClipboardItem]:
+        """获取历史记录：全部置顶项在前，其后为按 order 排序的 limit 条非置顶项"""
+        ...
+
+    def list_by_category(self, category_name: str) -> List[ClipboardItem]:
+        """获取某分类下的全部记录，置顶项在前"""
+        ...
+
+    def list_categories(self) -> List[Category]:
+        """获取全部分类"""
+        ...
+
+    def search(self, keyword: str, limit: Optional[int] = 50) -> List[ClipboardItem]:
+        """按子串（不区分大小写）搜索记录，最新的在前"""
+        ...
+
+    def set_pinned(self, item_id: int, pinned: bool) -> bool:
+        """设置置顶状态并刷新最后访问时间，记录不存在时返回False"""
+        ...
+
+    def delete_item(self, item_id: int, device_id: str) -> Optional[str]:
+        """软删除记录并写入墓碑，返回可用于撤销的批次ID，记录不存在时返回None"""
+        ...
+
+    def clear_all(self, device_id: str) -> Optional[str]:
+        """软删除全部记录，返回批次ID，没有可删除的记录时返回None"""
+        ...
+
+    def restore(self, batch_id: str) -> int:
+        """撤销一次删除操作，返回恢复的条数（已被物理删除的记录无法恢复）
+
+        墓碑不会被删除，而是标记撤销时间，作为一次变更同步给其他设备。
+        """
+        ...
+
+    def restore_origin(self, device_id: str, created_at: datetime) -> bool:
+        """撤销对某来源记录的删除，用于应用其他设备同步来的撤销，返回是否恢复了记录"""
+        ...
+
+    def purge_deleted(self, before: datetime, limit: int = 200) -> List[ClipboardItem]:
+        """物理删除 before 之前软删除的最多 limit 条记录，返回被删除的记录
+
+        会在后台线程中调用，实现需保证线程安全。
+        """
+        ...
+
+    def get_tombstones(self, since: Optional[datetime] = None) -> List[Tombstone]:
+        """获取 since 之后产生或被撤销的墓碑，按最后变更时间（撤销时间，未撤销时为删除时间）升序，用于多设备同步"""
+        ...
+
+    def record_usage(self, events: List[UsageRecord]):
+        """批量追加使用事件并累加各记录的使用次数，会在后台线程中调用"""
+        ...
+
+
+def _new_batch_id() -> str:
+    return str(uuid.uuid4())
+
+
+def _detach(row) -> ClipboardItem:
+    """将查询结果复制为脱离会话的 ClipboardItem，避免会话提交后属性过期"""
+    return ClipboardItem(
+        id=row.id,
+        content=row.content,
+        content_type=row.content_type,
+        created_at=row.created_at,
+        device_id=row.device_id,
+        category_id=row.category_id,
+        is_pinned=row.is_pinned,
+        last_accessed=row.last_accessed
+    )
+
+
+class SQLiteStorage:
+    """基于 SQLAlchemy 的 SQLite 存储后端"""
+
+    def __init__(self, db_url: str = DEFAULT_DB_URL, echo: bool = False):
+        self.engine = init_db(db_url, echo=echo)
+        self.Session = sessionmaker(bind=self.engine)
+        self.session = self.Session()
+
+    @property
+    def source(self) -> str:
+        """数据库的唯一标识（文件数据库取绝对路径），用于判断语义索引等派生数据是否属于本数据库"""
+        url = self.engine.url
+        if url.database and url.database != ':memory:':
+            url = url.set(database=os.path.abspath(url.database))
+        return url.render_as_string(hide_password=True)
+
+    def _commit(self):
+        try:
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+    def _get_or_create_category(self, name: str) -> Category:
+        category = self.session.query(Category).filter(Category.name == name).first()
+        if not category:
+            category = Category(name=name)
+            self.session.add(category)
+            self._commit()
+        return category
+
+    def add_item(self, content: str, content_type: ContentType, device_id: str,
+                 category_name: Optional[str] = None, created_at: Optional[datetime] = None) -> ClipboardItem:
+        item = ClipboardItem(
+            content=content,
+            content_type=content_type,
+            device_id=device_id
+        )
+        if created_at is not None:
+            item.created_at = created_at
+        if category_name:
+            item.category = self._get_or_create_category(category_name)
+        self.session.add(item)
+        self._commit()
+        return item
+
+    def get_item(self, item_id: int) -> Optional[ClipboardItem]:
+        return self.session.query(ClipboardItem)\
+            .filter(ClipboardItem.id == item_id)\
+            .filter(ClipboardItem.deleted_at.is_(None))\
+            .first()
+
+    def find_by_origin(self, device_id: str, created_at: datetime) -> Optional[ClipboardItem]:
+        row = self._columns()\
+            .filter(ClipboardItem.device_id == device_id)\
+            .filter(ClipboardItem.created_at == created_at)\
+            .first()
+        return _detach(row) if row else None
+
+    def list_added_since(self, after_id: Optional[int] = None) -> List[ClipboardItem]:
+        query = self._columns()
+        if after_id is not None:
+            query = query.filter(ClipboardItem.id > after_id)
+        return [_detach(row) for row in query.order_by(ClipboardItem.id).all()]
+
+    def has_tombstone(self, device_id: str, created_at: datetime) -> bool:
+        return self.session.query(Tombstone.id)\
+            .filter(Tombstone.item_device_id == device_id)\
+            .filter(Tombstone.item_created_at == created_at)\
+            .filter(Tombstone.restored_at.is_(None))\
+            .first() is not None
+
+    def list_texts(self) -> List[Tuple[int, str]]:
+        # 在后台线程中调用，使用独立的会话
+        with self.Session() as session:
+            rows = session.execute(
+                select(ClipboardItem.id, ClipboardItem.content)
+                .where(ClipboardItem.deleted_at.is_(None), ClipboardItem.content_type != ContentType.IMAGE)
+                .order_by(ClipboardItem.id)
+            ).all()
+        return [(row.id, row.content) for row in rows]
+
+    def _columns(self):
+        """查询未删除记录的各列"""
+        return self.session.query(ClipboardItem.id, ClipboardItem.content, ClipboardItem.content_type,
+                                  ClipboardItem.created_at, ClipboardItem.device_id, ClipboardItem.category_id,
+                                  ClipboardItem.is_pinned, ClipboardItem.last_accessed)\
+            .filter(ClipboardItem.deleted_at.is_(None))
+
+    def list_items(self, limit: Optional[int] = 50, order: str = ORDER_RECENT) -> List[ClipboardItem]:
+        # 先获取置顶项
+        pinned_items = self._columns()\
+            .filter(ClipboardItem.is_pinned == True)\
+            .order_by(ClipboardItem.last_accessed.desc())\
+            .all()
+
+        # 再获取非置顶项
+        if order == ORDER_MOST_USED:
+            unpinned_items = self._most_used(limit)
+        else:
+            unpinned_items = self._columns()\
+                .filter(ClipboardItem.is_pinned == False)\
+                .order_by(ClipboardItem.created_at.desc())\
+                .limit(limit)\
+                .all()
+
+        return [_detach(row) for row in pinned_items + unpinned_items]
+
+    def _most_used(self, limit: Optional[int]) -> list:
+        """按汇总表的排序索引分页取出记录ID，再按主键取回记录并过滤置顶和已删除的记录
+
+        分两步查询而不是联表，保证排序始终由索引完成，不会退化为全表聚合排序。
+        被复用过的记录取完后，剩余名额由从未被复用的记录按创建时间倒序补足。
+        """
+        result = []
+        offset = 0
+        while True:
+            ranked = [row.item_id for row in self.session.query(ItemUsage.item_id)
+                      .order_by(ItemUsage.use_count.desc(), ItemUsage.last_used_at.desc())
+                      .offset(offset)
+                      .limit(limit)
+                      .all()]
+            rows = {row.id: row for row in self._columns()
+                    .filter(ClipboardItem.id.in_(ranked))
+                    .filter(ClipboardItem.is_pinned == False)
+                    .all()}
+            result.extend(rows[item_id] for item_id in ranked if item_id in rows)
+            if limit is not None and len(result) >= limit:
+                return result[:limit]
+            if limit is None or len(ranked) < limit:
+                break
+            offset += len(ranked)
+
+        # 汇总表按主键逐条判断是否存在，同样不需要聚合
+        unused = self._columns()\
+            .filter(ClipboardItem.is_pinned == False)\
+            .filter(~select(ItemUsage.item_id).where(ItemUsage.item_id == ClipboardItem.id).exists())\
+            .order_by(ClipboardItem.created_at.desc())
+        if limit is not None:
+            unused = unused.limit(limit - len(result))
+        return result + unused.all()
+
+    def list_by_category(self, category_name: str) -> List[ClipboardItem]:
+        category = self.session.query(Category.id)\
+            .filter(Category.name == category_name)\
+            .first()
+        if not category:
+            return []
+
+        pinned_items = self._columns()\
+            .filter(ClipboardItem.category_id == category.id)\
+            .filter(ClipboardItem.is_pinned == True)\
+            .order_by(ClipboardItem.last_accessed.desc())\
+            .all()
+
+        unpinned_items = self._columns()\
+            .filter(ClipboardItem.category_id == category.id)\
+            .filter(ClipboardItem.is_pinned == False)\
+            .order_by(ClipboardItem.created_at.desc())\
+            .all()
+
+        return [_detach(row) for row in pinned_items + unpinned_items]
+
+    def list_categories(self) -> List[Category]:
+        return self.session.query(Category).all()
+
+    def search(self, keyword: str, limit: Optional[int] = 50) -> List[ClipboardItem]:
+        rows = self._columns()\
+            .filter(ClipboardItem.content.ilike(f'%{keyword}%'))\
+            .order_by(ClipboardItem.created_at.desc())\
+            .limit(limit)\
+            .all()
+        return [_detach(row) for row in rows]
+
+    def set_pinned(self, item_id: int, pinned: bool) -> bool:
+        item = self.get_item(item_id)
+        if not item:
+            return False
+        item.is_pinned = 1 if pinned else 0
+        item.last_accessed = datetime.now()
+        self._commit()
+        return True
+
+    def _soft_delete(self, device_id: str, *criteria) -> Optional[str]:
+        """用 INSERT ... SELECT 写入墓碑后批量标记删除，不加载ORM对象"""
+        now = datetime.now()
+        batch_id = _new_batch_id()
+        live = (ClipboardItem.deleted_at.is_(None),) + criteria
+        try:
+            result = self.session.execute(
+                insert(Tombstone).from_select(
+                    ['item_id', 'item_device_id', 'item_created_at', 'deleted_by', 'deleted_at', 'batch_id'],
+                    select(ClipboardItem.id, ClipboardItem.device_id, ClipboardItem.created_at,
+                           literal(device_id, String), literal(now, DateTime), literal(batch_id, String))
+                    .where(*live)
+                )
+            )
+            if not result.rowcount:
+                self.session.rollback()
+                return None
+            # 显式保留 last_accessed，避免 onupdate 改写后打乱置顶项的顺序
+            self.session.execute(
+                update(ClipboardItem).where(*live).values(deleted_at=now, last_accessed=ClipboardItem.last_accessed),
+                execution_options={'synchronize_session': False}
+            )
+        except Exception:
+            self.session.rollback()
+            raise
+        self._commit()
+        return batch_id
+
+    def delete_item(self, item_id: int, device_id: str) -> Optional[str]:
+        return self._soft_delete(device_id, ClipboardItem.id == item_id)
+
+    def clear_all(self, device_id: str) -> Optional[str]:
+        return self._soft_delete(device_id)
+
+    def _restore(self, *criteria) -> int:
+        """恢复符合条件的墓碑中尚未物理删除的记录，并将这些墓碑标记为已撤销"""
+        live = (Tombstone.restored_at.is_(None),) + criteria
+        try:
+            result = self.session.execute(
+                update(ClipboardItem)
+                .where(ClipboardItem.id.in_(select(Tombstone.item_id).where(Tombstone.purged_at.is_(None), *live)))
+                .values(deleted_at=None, last_accessed=ClipboardItem.last_accessed),
+                execution_options={'synchronize_session': False}
+            )
+            self.session.execute(update(Tombstone).where(*live).values(restored_at=datetime.now()),
+                                 execution_options={'synchronize_session': False})
+        except Exception:
+            self.session.rollback()
+            raise
+        self._commit()
+        return result.rowcount
+
+    def restore(self, batch_id: str) -> int:
+        # 已物理删除的记录无法撤销，其墓碑保持不变
+        return self._restore(Tombstone.batch_id == batch_id, Tombstone.purged_at.is_(None))
+
+    def restore_origin(self, device_id: str, created_at: datetime) -> bool:
+        # 本机已物理删除时也标记为已撤销，之后可以重新导入该记录
+        return self._restore(Tombstone.item_device_id == device_id, Tombstone.item_created_at == created_at) > 0
+
+    def purge_deleted(self, before: datetime, limit: int = 200) -> List[ClipboardItem]:
+        # 在后台线程中调用，使用独立的会话和短事务，避免与界面线程共享会话
+        with self.Session() as session:
+            tombstones = session.execute(
+                select(Tombstone.id, Tombstone.item_id)
+                .where(Tombstone.purged_at.is_(None), Tombstone.restored_at.is_(None), Tombstone.deleted_at < before)
+                .order_by(Tombstone.deleted_at)
+                .limit(limit)
+            ).all()
+            if not tombstones:
+                return []
+            item_ids = [row.item_id for row in tombstones]
+            doomed = (ClipboardItem.id.in_(item_ids), ClipboardItem.deleted_at.is_not(None))
+            rows = session.execute(
+                select(ClipboardItem.id, ClipboardItem.content, ClipboardItem.content_type,
+                       ClipboardItem.created_at, ClipboardItem.device_id, ClipboardItem.category_id,
+                       ClipboardItem.is_pinned, ClipboardItem.last_accessed)
+                .where(*doomed)
+            ).all()
+            purged_ids = [row.id for row in rows]
+            session.execute(delete(ItemUsage).where(ItemUsage.item_id.in_(purged_ids)),
+                            execution_options={'synchronize_session': False})
+            session.execute(delete(UsageEvent).where(UsageEvent.item_id.in_(purged_ids)),
+                            execution_options={'synchronize_session': False})
+            session.execute(delete(ClipboardItem).where(*doomed),
+                            execution_options={'synchronize_session': False})
+            session.execute(
+                update(Tombstone)
+                .where(Tombstone.id.in_([row.id for row in tombstones]))
+                .values(purged_at=datetime.now()),
+                execution_options={'synchronize_session': False}
+            )
+            session.commit()
+            return [_detach(row) for row in rows]
+
+    def get_tombstones(self, since: Optional[datetime] = None) -> List[Tombstone]:
+        query = self.session.query(Tombstone)
+        if since is not None:
+            query = query.filter(or_(Tombstone.deleted_at > since, Tombstone.restored_at > since))
+        return query.order_by(func.coalesce(Tombstone.restored_at, Tombstone.deleted_at)).all()
+
+    def record_usage(self, events: List[UsageRecord]):
+        if not events:
+            return
+        counts = Counter(item_id for item_id, _, _ in events)
+        last_used = {}
+        for item_id, _, used_at in events:
+            last_used[item_id] = max(used_at, last_used.get(item_id, used_at))
+        # 在后台线程中调用，使用独立的会话，事件和汇总计数在同一事务中写入
+        with self.Session() as session:
+            session.execute(insert(UsageEvent), [
+                {'item_id': item_id, 'device_id': device_id, 'used_at': used_at}
+                for item_id, device_id, used_at in events
+            ])
+            for item_id, count in counts.items():
+                upsert = sqlite_insert(ItemUsage).values(
+                    item_id=item_id, use_count=count, last_used_at=last_used[item_id])
+                session.execute(upsert.on_conflict_do_update(
+                    index_elements=[ItemUsage.item_id],
+                    set_={'use_count': ItemUsage.use_count + count,
+                          'last_used_at': func.max(ItemUsage.last_used_at, upsert.excluded.last_used_at)}
+                ))
+            session.commit()
+
+
+def _locked(method):
+    """MemoryStorage 的方法会被后台清理线程并发调用，统一加锁"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class MemoryStorage:
+    """纯内存存储后端，用于测试、基准测试和临时会话
+
+    记录按ID保存在字典中。全部记录、非置顶项和各分类分别用按 (创建时间, ID) 排序的列表做索引，
+    增删时二分查找定位；置顶项用有序字典按最后访问时间排列。按索引倒序遍历即可得到列表结果。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._items: dict[int, ClipboardItem] = {}
+        self._deleted: dict[int, ClipboardItem] = {}
+        self._categories: dict[str, Category] = {}
+        # 有序索引，元素为 (创建时间, 记录ID)，同步导入的较早记录也能直接插入到正确位置
+        self._created: List[Tuple[datetime, int]] = []
+        self._unpinned: List[Tuple[datetime, int]] = []
+        self._by_category: dict[int, List[Tuple[datetime, int]]] = {}
+        # 有序字典当作有序集合使用，置顶项按最后访问时间升序排列
+        self._pinned: dict[int, None] = {}
+        self._by_origin: dict[Tuple[str, datetime], int] = {}  # (来源设备, 创建时间) -> 记录ID
+        # 全部墓碑按删除时间升序排列；尚未物理删除的另按ID索引，便于按批次撤销和清理
+        self._tombstones: List[Tombstone] = []
+        self._pending: dict[int, Tombstone] = {}
+        # 未撤销的墓碑按 (来源设备, 创建时间) 索引
+        self._tombstoned: dict[Tuple[str, datetime], List[Tombstone]] = {}
+        # 使用事件只追加；汇总计数另按 (-次数, -最后使用时间, ID) 保存为有序列表，充当排序索引
+        self._usage_events: List[UsageEvent] = []
+        self._usage: dict[int, ItemUsage] = {}
+        self._usage_rank: List[Tuple[int, float, int]] = []
+        self._next_item_id = 1
+        self._next_category_id = 1
+        self._next_tombstone_id = 1
+
+    def _get_or_create_category(self, name: str) -> Category:
+        category = self._categories.get(name)
+        if not category:
+            category = Category(id=self._next_category_id, name=name)
+            self._next_category_id += 1
+            self._categories[name] = category
+            self._by_category[category.id] = []
+        return category
+
+    @staticmethod
+    def _key(item: ClipboardItem) -> Tuple[datetime, int]:
+        return item.created_at, item.id
+
+    @staticmethod
+    def _discard(index: List[Tuple[datetime, int]], key: Tuple[datetime, int]):
+        position = bisect.bisect_left(index, key)
+        if position < len(index) and index[position] == key:
+            del index[position]
+
+    def _index(self, item: ClipboardItem):
+        """将记录加入各索引"""
+        key = self._key(item)
+        bisect.insort(self._created, key)
+        if item.is_pinned:
+            self._pinned[item.id] = None
+        else:
+            bisect.insort(self._unpinned, key)
+        if item.category_id is not None:
+            bisect.insort(self._by_category[item.category_id], key)
+        self._by_origin[(item.device_id, item.created_at)] = item.id
+
+    def _unindex(self, item: ClipboardItem):
+        """将记录从各索引中移除"""
+        key = self._key(item)
+        self._discard(self._created, key)
+        self._pinned.pop(item.id, None)
+        self._discard(self._unpinned, key)
+        if item.category_id is not None:
+            self._discard(self._by_category[item.category_id], key)
+        self._by_origin.pop((item.device_id, item.created_at), None)
+
+    @_locked
+    def add_item(self, content: str, content_type: ContentType, device_id: str,
+                 category_name: Optional[str] = None, created_at: Optional[datetime] = None) -> ClipboardItem:
+        now = datetime.now()
+        item = ClipboardItem(
+            id=self._next_item_id,
+            content=content,
+            content_type=content_type,
+            created_at=created_at or now,
+            device_id=device_id,
+            is_pinned=0,
+            last_accessed=now
+        )
+        self._next_item_id += 1
+        if category_name:
+            category = self._get_or_create_category(category_name)
+            item.category = category
+            item.category_id = category.id
+        self._items[item.id] = item
+        self._index(item)
+        return item
+
+    @_locked
+    def get_item(self, item_id: int) -> Optional[ClipboardItem]:
+        return self._items.get(item_id)
+
+    @_locked
+    def find_by_origin(self, device_id: str, created_at: datetime) -> Optional[ClipboardItem]:
+        item_id = self._by_origin.get((device_id, created_at))
+        return self._items.get(item_id) if item_id is not None else None
+
+    @_locked
+    def list_added_since(self, after_id: Optional[int] = None) -> List[ClipboardItem]:
+        return [self._items[item_id] for item_id in sorted(self._items)
+                if after_id is None or item_id > after_id]
+
+    @_locked
+    def has_tombstone(self, device_id: str, created_at: datetime) -> bool:
+        return (device_id, created_at) in self._tombstoned
+
+    @_locked
+    def list_texts(self) -> List[Tuple[int, str]]:
+        return [(item.id, item.content) for item in self._items.values() if item.content_type != ContentType.IMAGE]
+
+    def _is_unpinned(self, item_id: int) -> bool:
+        item = self._items.get(item_id)
+        return item is not None and not item.is_pinned
+
+    def _ordered(self, pinned_ids, unpinned_ids, limit: Optional[int] = None) -> List[ClipboardItem]:
+        """pinned_ids 按最后访问时间升序，unpinned_ids 已按目标顺序排列"""
+        result = [self._items[item_id] for item_id in reversed(pinned_ids)]
+        result.extend(self._items[item_id] for item_id in islice(unpinned_ids, limit))
+        return result
+
+    @_locked
+    def list_items(self, limit: Optional[int] = 50, order: str = ORDER_RECENT) -> List[ClipboardItem]:
+        if order == ORDER_MOST_USED:
+            ranked = (item_id for _, _, item_id in self._usage_rank if self._is_unpinned(item_id))
+            # 从未被复用的记录排在最后，按创建时间倒序
+            unused = (item_id for _, item_id in reversed(self._unpinned) if item_id not in self._usage)
+            return self._ordered(self._pinned, chain(ranked, unused), limit)
+        return self._ordered(self._pinned, (item_id for _, item_id in reversed(self._unpinned)), limit)
+
+    @_locked
+    def list_by_category(self, category_name: str) -> List[ClipboardItem]:
+        category = self._categories.get(category_name)
+        if not category:
+            return []
+        members = self._by_category[category.id]
+        pinned = sorted((item_id for _, item_id in members if self._items[item_id].is_pinned),
+                        key=lambda item_id: self._items[item_id].last_accessed)
+        return self._ordered(pinned, (item_id for _, item_id in reversed(members)
+                                      if not self._items[item_id].is_pinned))
+
+    @_locked
+    def list_categories(self) -> List[Category]:
+        return list(self._categories.values())
+
+    @_locked
+    def search(self, keyword: str, limit: Optional[int] = 50) -> List[ClipboardItem]:
+        keyword = keyword.lower()
+        matches = (self._items[item_id] for _, item_id in reversed(self._created)
+                   if keyword in self._items[item_id].content.lower())
+        return list(islice(matches, limit))
+
+    @_locked
+    def set_pinned(self, item_id: int, pinned: bool) -> bool:
+        item = self._items.get(item_id)
+        if not item:
+            return False
+        was_pinned = bool(item.is_pinned)
+        item.is_pinned = 1 if pinned else 0
+        item.last_accessed = datetime.now()
+        self._pinned.pop(item_id, None)
+        if pinned:
+            # 重新置顶时移到末尾，保持按最后访问时间排列
+            self._pinned[item_id] = None
+            if not was_pinned:
+                self._discard(self._unpinned, self._key(item))
+        elif was_pinned:
+            # 取消置顶后按创建时间放回原位置
+            bisect.insort(self._unpinned, self._key(item))
+        return True
+
+    def _tombstone(self, item: ClipboardItem, device_id: str, now: datetime, batch_id: str):
+        tombstone = Tombstone(
+            id=self._next_tombstone_id,
+            item_id=item.id,
+            item_device_id=item.device_id,
+            item_created_at=item.created_at,
+            deleted_by=device_id,
+            deleted_at=now,
+            batch_id=batch_id
+        )
+        self._next_tombstone_id += 1
+        item.deleted_at = now
+        self._deleted[item.id] = item
+        self._tombstones.append(tombstone)
+        self._pending[tombstone.id] = tombstone
+        self._tombstoned.setdefault((item.device_id, item.created_at), []).append(tombstone)
+
+    @_locked
+    def delete_item(self, item_id: int, device_id: str) -> Optional[str]:
+        item = self._items.pop(item_id, None)
+        if not item:
+            return None
+        self._unindex(item)
+        batch_id = _new_batch_id()
+        self._tombstone(item, device_id, datetime.now(), batch_id)
+        return batch_id
+
+    @_locked
+    def clear_all(self, device_id: str) -> Optional[str]:
+        if not self._items:
+            return None
+        now = datetime.now()
+        batch_id = _new_batch_id()
+        for item in self._items.values():
+            self._tombstone(item, device_id, now, batch_id)
+        self._items.clear()
+        self._created.clear()
+        self._pinned.clear()
+        self._unpinned.clear()
+        self._by_origin.clear()
+        for members in self._by_category.values():
+            members.clear()
+        return batch_id
+
+    @_locked
+    def restore(self, batch_id: str) -> int:
+        return self._restore([t for t in self._pending.values() if t.batch_id == batch_id])
+
+    @_locked
+    def restore_origin(self, device_id: str, created_at: datetime) -> bool:
+        # 本机已物理删除时也标记为已撤销，之后可以重新导入该记录
+        return self._restore(self._tombstoned.get((device_id, created_at), [])) > 0
+
+    def _restore(self, tombstones: List[Tombstone]) -> int:
+        """将墓碑标记为已撤销，并恢复其中尚未物理删除的记录"""
+        now = datetime.now()
+        restored = []
+        for tombstone in list(tombstones):
+            tombstone.restored_at = now
+            origin = (tombstone.item_device_id, tombstone.item_created_at)
+            remaining = [t for t in self._tombstoned.get(origin, []) if t is not tombstone]
+            if remaining:
+                self._tombstoned[origin] = remaining
+            else:
+                self._tombstoned.pop(origin, None)
+            if self._pending.pop(tombstone.id, None) is None:
+                continue
+            item = self._deleted.pop(tombstone.item_id)
+            item.deleted_at = None
+            self._items[item.id] = item
+            self._by_origin[origin] = item.id
+            restored.append(item)
+        if not restored:
+            return 0
+        # 恢复的记录整批追加后重新排序，避免逐条插入有序列表；各列表已基本有序，排序接近线性
+        self._created.extend(self._key(item) for item in restored)
+        self._created.sort()
+        self._unpinned.extend(self._key(item) for item in restored if not item.is_pinned)
+        self._unpinned.sort()
+        touched = set()
+        for item in restored:
+            if item.category_id is not None:
+                self._by_category[item.category_id].append(self._key(item))
+                touched.add(item.category_id)
+        for category_id in touched:
+            self._by_category[category_id].sort()
+        pinned = list(self._pinned) + [item.id for item in restored if item.is_pinned]
+        self._pinned = dict.fromkeys(sorted(pinned, key=lambda i: self._items[i].last_accessed))
+        return len(restored)
+
+    @_locked
+    def purge_deleted(self, before: datetime, limit: int = 200) -> List[ClipboardItem]:
+        purged = []
+        now = datetime.now()
+        for tombstone in list(islice(self._pending.values(), limit)):
+            if tombstone.deleted_at >= before:
+                break
+            del self._pending[tombstone.id]
+            tombstone.purged_at = now
+            purged.append(self._deleted.pop(tombstone.item_id))
+            self._drop_usage(tombstone.item_id)
+        if purged:
+            purged_ids = {item.id for item in purged}
+            self._usage_events = [e for e in self._usage_events if e.item_id not in purged_ids]
+        return purged
+
+    @staticmethod
+    def _rank_key(usage: ItemUsage) -> Tuple[int, float, int]:
+        return -usage.use_count, -usage.last_used_at.timestamp(), usage.item_id
+
+    def _drop_usage(self, item_id: int):
+        usage = self._usage.pop(item_id, None)
+        if usage:
+            key = self._rank_key(usage)
+            del self._usage_rank[bisect.bisect_left(self._usage_rank, key)]
+
+    @_locked
+    def get_tombstones(self, since: Optional[datetime] = None) -> List[Tombstone]:
+        changed = [t for t in self._tombstones
+                   if since is None or t.deleted_at > since or (t.restored_at is not None and t.restored_at > since)]
+        return sorted(changed, key=lambda t: t.restored_at or t.deleted_at)
+
+    @_locked
+    def record_usage(self, events: List[UsageRecord]):
+        for item_id, device_id, used_at in events:
+            self._usage_events.append(UsageEvent(item_id=item_id, device_id=device_id, used_at=used_at))
+            usage = self._usage.get(item_id)
+            if usage:
+                del self._usage_rank[bisect.bisect_left(self._usage_rank, self._rank_key(usage))]
+                usage.use_count += 1
+                usage.last_used_at = max(usage.last_used_at, used_at)
+            else:
+                usage = self._usage[item_id] = ItemUsage(item_id=item_id, use_count=1, last_used_at=used_at)
+            bisect.insort(self._usage_rank, self._rank_key(usage))
+
+
+# 可通过配置选择的存储后端
+STORAGE_BACKENDS = {
+    'sqlite': SQLiteStorage,
+    'memory': MemoryStorage,
+}
+
+
+def create_storage(backend: Optional[str] = None, **options) -> StorageBackend:
+    """根据配置创建存储后端
+
+    未指定 backend 时读取环境变量 CLIPBOARD_STORAGE（默认 sqlite），
+    SQLite 后端的数据库地址读取 CLIPBOARD_DB_URL（默认 sqlite:///clipboards.db）。
+    """
+    backend = backend or os.getenv('CLIPBOARD_STORAGE', 'sqlite')
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"未知的存储后端: {backend}，可选: {', '.join(STORAGE_BACKENDS)}")
+    if backend == 'sqlite':
+        options.setdefault('db_url', os.getenv('CLIPBOARD_DB_URL', DEFAULT_DB_URL))
+    logger.info(f"使用存储后端: {backend}")
+    return STORAGE_BACKENDS[backend](**options)
@@ -0,0 +1,320 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, List, Protocol
+
+from loguru import logger
+
+from chunking import ChunkStore
+from models import ClipboardItem, ContentType
+from profiler import PROFILER
+from purger import IMAGE_DIR
+from storage import StorageBackend
+
+# 不超过此字节数的文本直接放在清单中，不再单独传输分块
+INLINE_LIMIT = 1024
+# 并行拉取分块的线程数
+SYNC_WORKERS = 4
+
+
+class SyncPeer(Protocol):
+    """同步对端的传输接口，bytes_sent / bytes_received 为累计的线路字节数"""
+
+    device_id: str
+    bytes_sent: int
+    bytes_received: int
+
+    def get_manifests(self, since: Optional[dict]) -> dict:
+        """获取对端在游标 since 之后新增的记录清单和墓碑"""
+        ...
+
+    def get_chunk(self, digest: str) -> bytes:
+        """获取一个分块"""
+        ...
+
+
+@dataclass
+class SyncReport:
+    """一次拉取同步的结果"""
+    peer_id: str
+    items_received: int = 0  # 清单中本机尚没有的记录数
+    items_imported: int = 0
+    tombstones_applied: int = 0
+    chunks_needed: int = 0
+    chunks_reused: int = 0  # 本机已有、无需传输的分块
+    chunks_fetched: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    complete: bool = False  # 为 False 时游标未推进，再次同步会从中断处续传
+
+    def __str__(self) -> str:
+        return (f"对端 {self.peer_id}: 导入 {self.items_imported}/{self.items_received} 条记录，"
+                f"应用 {self.tombstones_applied} 个墓碑，分块 {self.chunks_fetched} 拉取 / "
+                f"{self.chunks_reused} 复用 / {self.chunks_needed} 需要，"
+                f"发送 {self.bytes_sent} 字节，接收 {self.bytes_received} 字节"
+                f"{'' if self.complete else '（未完成）'}")
+
+
+def origin_key(device_id: str, created_at: datetime) -> str:
+    """记录的跨设备标识，用作分块的引用方"""
+    return f'{device_id}/{created_at.isoformat()}'
+
+
+class SyncNode:
+    """多设备同步的一端：向其他设备提供清单和分块，也可从其他设备拉取
+
+    大内容按内容定义的边界切分为分块，清单中只列出分块地址。拉取方先比对本机已有的分块（have），
+    只并行请求缺少的分块（want）；分块写入即持久化，传输中断后再次同步只会拉取剩余的分块。
+    游标使用导出方本机的记录ID和墓碑时间，转发自其他设备的记录也会被同步。
+    与 TombstonePurger 一起使用时应将 release_items 注册为清理回调，及时删除不再被引用的分块。
+    """
+
+    def __init__(self, storage: StorageBackend, chunk_store: ChunkStore, device_id: str,
+                 image_dir: str = IMAGE_DIR, state_file: Optional[str] = None):
+        self.storage = storage
+        self.chunk_store = chunk_store
+        self.device_id = device_id
+        self.image_dir = image_dir
+        self.state_file = state_file
+        # 每个对端的同步游标（对端的记录ID和墓碑最后变更时间），只在一次同步完整结束后推进
+        self.cursors: dict[str, dict] = {}
+        if state_file and os.path.exists(state_file):
+            with open(state_file, 'r') as f:
+                # 旧版本按时间保存的游标不再适用，丢弃后完整同步一次，已有的记录会按来源去重
+                self.cursors = {peer: cursor for peer, cursor in json.load(f).items() if isinstance(cursor, dict)}
+
+    # ---- 提供给其他设备 ----
+
+    def export_manifests(self, since: Optional[dict] = None) -> dict:
+        """导出游标 since 之后新增的记录清单和墓碑，返回的 cursor 供对端下次同步使用"""
+        since = since or {}
+        cursor = dict(since)
+        categories = {category.id: category.name for category in self.storage.list_categories()}
+        items = []
+        exported = set()
+        for item in self.storage.list_added_since(since.get('item_id')):
+            manifest = self._manifest(item, categories)
+            if manifest:
+                items.append(manifest)
+            exported.add(item.id)
+            cursor['item_id'] = item.id
+        since_time = datetime.fromisoformat(since['tombstone_at']) if since.get('tombstone_at') else None
+        tombstones = []
+        for tombstone in self.storage.get_tombstones(since_time):
+            restored = tombstone.restored_at is not None
+            tombstones.append({
+                'device_id': tombstone.item_device_id,
+                'created_at': tombstone.item_created_at.isoformat(),
+                'deleted_by': tombstone.deleted_by,
+                'restored': restored,
+            })
+            cursor['tombstone_at'] = (tombstone.restored_at or tombstone.deleted_at).isoformat()
+            if restored:
+                # 撤销删除的记录可能在删除期间被游标跳过，随撤销一并导出，对端缺少时可重新导入
+                item = self.storage.find_by_origin(tombstone.item_device_id, tombstone.item_created_at)
+                if item and item.id not in exported:
+                    manifest = self._manifest(item, categories)
+                    if manifest:
+                        items.append(manifest)
+                    exported.add(item.id)
+        return {'device_id': self.device_id, 'cursor': cursor, 'items': items, 'tombstones': tombstones}
+
+    def read_chunk(self, digest: str) -> bytes:
+        """读取一个分块"""
+        return self.chunk_store.get(digest)
+
+    def release_items(self, items: List[ClipboardItem]) -> int:
+        """记录被物理删除后解除其分块引用，返回删除的分块数，可作为 TombstonePurger 的清理回调"""
+        removed = self.chunk_store.release(origin_key(item.device_id, item.created_at) for item in items)
+        if removed:
+            logger.info(f"已删除 {removed} 个不再被引用的分块")
+        return removed
+
+    def _manifest(self, item: ClipboardItem, categories: dict) -> Optional[dict]:
+        manifest = {
+            'device_id': item.device_id,
+            'created_at': item.created_at.isoformat(),
+            'content_type': item.content_type.value,
+            'category': categories.get(item.category_id),
+            'inline': None,
+            'file_name': None,
+            'chunks': [],
+        }
+        if item.content_type == ContentType.IMAGE:
+            if not os.path.exists(item.content):
+                logger.warning(f"图片文件不存在，跳过同步: {item.content}")
+                return None
+            with open(item.content, 'rb') as f:
+                payload = f.read()
+            manifest['file_name'] = os.path.basename(item.content)
+        else:
+            payload = item.content.encode('utf-8')
+            if len(payload) <= INLINE_LIMIT:
+                manifest['inline'] = item.content
+        if manifest['inline'] is None:
+            manifest['chunks'] = self.chunk_store.put_all(payload, owner=origin_key(item.device_id, item.created_at))
+        manifest['size'] = len(payload)
+        return manifest
+
+    # ---- 从其他设备拉取 ----
+
+    def pull(self, peer: SyncPeer, workers: int = SYNC_WORKERS) -> SyncReport:
+        """从对端拉取新增记录和墓碑，返回同步结果"""
+        report = SyncReport(peer_id=peer.device_id)
+        sent_before, received_before = peer.bytes_sent, peer.bytes_received
+        error = None
+        try:
+            response = peer.get_manifests(self.cursors.get(peer.device_id))
+            # 先应用撤销，被撤销删除的记录不再视为已删除，本机缺少时会在下面重新导入
+            restores = [t for t in response['tombstones'] if t['restored']]
+            deletions = [t for t in response['tombstones'] if not t['restored']]
+            report.tombstones_applied = self._apply_restores(restores)
+            # 跳过本机已有的记录，以及本机删除过的记录（已删除的不会被 find_by_origin 找到）
+            manifests = []
+            for manifest in response['items']:
+                created_at = datetime.fromisoformat(manifest['created_at'])
+                if self.storage.find_by_origin(manifest['device_id'], created_at) is None \
+                        and not self.storage.has_tombstone(manifest['device_id'], created_at):
+                    manifests.append(manifest)
+            report.items_received = len(manifests)
+            # 拉取前先登记引用，避免已有的共享分块在同步期间被清理线程删除
+            self.chunk_store.retain({origin_key(m['device_id'], datetime.fromisoformat(m['created_at'])): m['chunks']
+                                     for m in manifests if m['chunks']})
+
+            # have/want 协商：只请求本机缺少的分块
+            needed = list(dict.fromkeys(digest for m in manifests for digest in m['chunks']))
+            wanted = [digest for digest in needed if not self.chunk_store.has(digest)]
+            report.chunks_needed = len(needed)
+            report.chunks_reused = len(needed) - len(wanted)
+            try:
+                report.chunks_fetched = self._fetch_chunks(peer, wanted, workers)
+            except Exception as e:
+                error = e
+                report.chunks_fetched = sum(self.chunk_store.has(digest) for digest in wanted)
+
+            # 分块已齐全的记录先导入，其余等下次同步续传
+            for manifest in manifests:
+                if all(self.chunk_store.has(digest) for digest in manifest['chunks']):
+                    self._import(manifest)
+                    report.items_imported += 1
+            report.tombstones_applied += self._apply_tombstones(deletions)
+
+            if error is None and report.items_imported == report.items_received:
+                self.cursors[peer.device_id] = response['cursor']
+                self._save_state()
+                report.complete = True
+        except Exception as e:
+            error = e
+
+        report.bytes_sent = peer.bytes_sent - sent_before
+        report.bytes_received = peer.bytes_received - received_before
+        if error is not None:
+            logger.error(f"同步中断: {str(error)}")
+        logger.info(f"同步结果 {report}")
+        return report
+
+    def _fetch_chunks(self, peer: SyncPeer, digests: List[str], workers: int) -> int:
+        """并行拉取分块并校验保存，任一分块失败时取消其余请求并抛出异常"""
+        if not digests:
+            return 0
+        fetched = 0
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='SyncWorker')
+        try:
+            futures = [executor.submit(self._fetch_chunk, peer, digest) for digest in digests]
+            for future in as_completed(futures):
+                future.result()
+                fetched += 1
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        return fetched
+
+    def _fetch_chunk(self, peer: SyncPeer, digest: str):
+        with PROFILER.thread_scope():
+            self.chunk_store.put(peer.get_chunk(digest), digest)
+
+    def _import(self, manifest: dict):
+        content_type = ContentType(manifest['content_type'])
+        if manifest['inline'] is not None:
+            content = manifest['inline']
+        else:
+            payload = self.chunk_store.assemble(manifest['chunks'])
+            if content_type == ContentType.IMAGE:
+                content = self._save_image(manifest['file_name'], payload)
+            else:
+                content = payload.decode('utf-8')
+        self.storage.add_item(content, content_type, manifest['device_id'], manifest['category'],
+                              created_at=datetime.fromisoformat(manifest['created_at']))
+
+    def _save_image(self, file_name: str, payload: bytes) -> str:
+        """保存同步来的图片，同名但内容不同时加上内容哈希前缀"""
+        os.makedirs(self.image_dir, exist_ok=True)
+        path = os.path.join(self.image_dir, file_name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                if f.read() == payload:
+                    return path
+            path = os.path.join(self.image_dir, f'{hashlib.sha256(payload).hexdigest()[:8]}_{file_name}')
+        with open(path, 'wb') as f:
+            f.write(payload)
+        return path
+
+    def _apply_restores(self, tombstones: List[dict]) -> int:
+        applied = 0
+        for tombstone in tombstones:
+            if self.storage.restore_origin(tombstone['device_id'], datetime.fromisoformat(tombstone['created_at'])):
+                applied += 1
+        return applied
+
+    def _apply_tombstones(self, tombstones: List[dict]) -> int:
+        applied = 0
+        for tombstone in tombstones:
+            item = self.storage.find_by_origin(tombstone['device_id'], datetime.fromisoformat(tombstone['created_at']))
+            if item and self.storage.delete_item(item.id, tombstone['deleted_by']):
+                applied += 1
+        return applied
+
+    def _save_state(self):
+        if not self.state_file:
+            return
+        with open(self.state_file, 'w') as f:
+            json.dump(self.cursors, f)
+
+
+class LoopbackPeer:
+    """本地回环对端：像网络传输一样序列化请求和响应并统计线路字节数，用于测试和基准测试
+
+    fail_after 不为空时，提供该数量的分块后模拟传输中断。
+    """
+
+    def __init__(self, node: SyncNode, fail_after: Optional[int] = None):
+        self.node = node
+        self.device_id = node.device_id
+        self.fail_after = fail_after
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._chunks_served = 0
+        self._lock = threading.Lock()
+
+    def _count(self, sent: int, received: int):
+        with self._lock:
+            self.bytes_sent += sent
+            self.bytes_received += received
+
+    def get_manifests(self, since: Optional[dict]) -> dict:
+        request = json.dumps({'since': since}).encode('utf-8')
+        response = json.dumps(self.node.export_manifests(since)).encode('utf-8')
+        self._count(len(request), len(response))
+        return json.loads(response)
+
+    def get_chunk(self, digest: str) -> bytes:
+        with self._lock:
+            if self.fail_after is not None and self._chunks_served >= self.fail_after:
+                raise ConnectionError("模拟传输中断")
+            self._chunks_served += 1
+        data = self.node.read_chunk(digest)
+        self._count(len(digest), len(data))
+        return data
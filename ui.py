@@ -1,13 +1,15 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QListWidget,
                              QListWidgetItem, QPushButton, QLabel, QComboBox,
-                             QTabWidget, QSplitter, QLineEdit)
-from PyQt6.QtCore import Qt, pyqtSlot, QSize
-from PyQt6.QtGui import QClipboard, QIcon
+                             QTabWidget, QSplitter, QLineEdit, QCheckBox)
+from PyQt6.QtCore import Qt, pyqtSlot, QTimer
+from PyQt6.QtGui import QClipboard
 from loguru import logger
-from datetime import datetime
 
-from models import ClipboardItem, Category
+from models import ClipboardItem
 from clipboard_manager import ClipboardMonitor
+from storage import ORDER_RECENT, ORDER_MOST_USED
+from purger import UNDO_WINDOW_SECONDS
+import resources
 
 class ClipboardHistoryWidget(QWidget):
     def __init__(self, clipboard: QClipboard, monitor: ClipboardMonitor):
@@ -15,11 +17,13 @@ class ClipboardHistoryWidget(QWidget):
         self.clipboard = clipboard
         self.monitor = monitor
         self._updating_categories = False  # 添加标志位
+        self.order = ORDER_RECENT  # 非置顶项的排序方式
         self.setup_ui()
         self.setup_connections()
         self.load_history()
 
     def setup_ui(self):
+        resources.preload_icons()
         layout = QVBoxLayout(self)
         layout.setContentsMargins(20, 20, 20, 20)  # 增加边距
         layout.setSpacing(15)  # 增加组件间距
@@ -103,13 +107,18 @@ class ClipboardHistoryWidget(QWidget):
             QTabBar::tab:hover {
                 background-color: #d0ebff;
             }
-        """)
+        """ + resources.ROW_STYLE)
 
-        # 创建搜索框
+        # 创建搜索框和语义搜索开关
+        search_layout = QHBoxLayout()
         self.search_box = QLineEdit()
         self.search_box.setPlaceholderText('搜索历史记录...')
         self.search_box.setMinimumHeight(36)
-        layout.addWidget(self.search_box)
+        search_layout.addWidget(self.search_box)
+        self.semantic_check = QCheckBox('语义搜索')
+        self.semantic_check.setEnabled(self.monitor.semantic_index is not None)
+        search_layout.addWidget(self.semantic_check)
+        layout.addLayout(search_layout)
 
         # 创建顶部布局，包含分类选择器和清除全部按钮
         top_layout = QHBoxLayout()
@@ -118,6 +127,12 @@ class ClipboardHistoryWidget(QWidget):
         self.category_combo = QComboBox()
         self.category_combo.addItem('全部')
         top_layout.addWidget(self.category_combo)
+
+        # 创建排序方式选择器
+        self.order_combo = QComboBox()
+        self.order_combo.addItem('按时间', ORDER_RECENT)
+        self.order_combo.addItem('最常用', ORDER_MOST_USED)
+        top_layout.addWidget(self.order_combo)
         
         # 创建清除全部按钮
         self.clear_all_btn = QPushButton('清除全部')
@@ -139,6 +154,15 @@ class ClipboardHistoryWidget(QWidget):
         """)
         self.clear_all_btn.clicked.connect(self.confirm_clear_all)
         top_layout.addWidget(self.clear_all_btn)
+
+        # 创建撤销删除按钮，删除后在撤销时限内显示
+        self.undo_btn = QPushButton('撤销删除')
+        self.undo_btn.clicked.connect(self.undo_delete)
+        self.undo_btn.hide()
+        top_layout.addWidget(self.undo_btn)
+        self.undo_timer = QTimer(self)
+        self.undo_timer.setSingleShot(True)
+        self.undo_timer.timeout.connect(self.undo_btn.hide)
         
         layout.addLayout(top_layout)
 
@@ -161,12 +185,14 @@ class ClipboardHistoryWidget(QWidget):
         # 连接信号和槽
         self.monitor.content_changed.connect(self.on_clipboard_changed)
         self.search_box.textChanged.connect(self.filter_history)
+        self.semantic_check.toggled.connect(self.toggle_semantic_search)
         self.category_combo.currentTextChanged.connect(self.filter_by_category)
+        self.order_combo.currentIndexChanged.connect(self.change_order)
 
     def load_history(self):
         # 加载历史记录
         logger.info("加载剪贴板历史记录")
-        items = self.monitor.get_history()
+        items = self.monitor.get_history(order=self.order)
         self.history_list.clear()
         
         # 直接使用已排序的列表
@@ -200,7 +226,7 @@ class ClipboardHistoryWidget(QWidget):
         meta_label = QLabel(f'类型: {item.content_type.value} | '
                           f'时间: {item.created_at.strftime("%Y-%m-%d %H:%M:%S")} | '
                           f'分类: {item.category.name if item.category else "未分类"}')
-        meta_label.setStyleSheet('color: gray; font-size: 10px;')
+        meta_label.setObjectName(resources.META_LABEL_NAME)
         content_layout.addWidget(meta_label)
         
         # 添加内容区域到主布局
@@ -212,17 +238,17 @@ class ClipboardHistoryWidget(QWidget):
         
         # 添加操作按钮
         copy_btn = QPushButton()
-        copy_btn.setIcon(QIcon('icons/icons8-copy-48.png'))
+        copy_btn.setIcon(resources.icon('copy'))
         pin_btn = QPushButton()
-        pin_btn.setIcon(QIcon('icons/icons8-unpin-100.png' if item.is_pinned else 'icons/icons8-pin-48.png'))
+        pin_btn.setIcon(resources.icon('unpin' if item.is_pinned else 'pin'))
         delete_btn = QPushButton()
-        delete_btn.setIcon(QIcon('icons/icons8-delete-button-48.png'))
+        delete_btn.setIcon(resources.icon('delete'))
         
-        # 设置按钮样式和大小
+        # 设置按钮样式和大小，样式由窗口样式表统一提供
         for btn in [copy_btn, pin_btn, delete_btn]:
-            btn.setFixedSize(32, 32)
-            btn.setStyleSheet('padding: 4px;')
-            btn.setIconSize(btn.size() - QSize(8, 8))
+            btn.setObjectName(resources.ROW_BUTTON_NAME)
+            btn.setFixedSize(resources.ROW_BUTTON_SIZE)
+            btn.setIconSize(resources.ROW_ICON_SIZE)
         
         button_layout.addWidget(copy_btn)
         button_layout.addWidget(pin_btn)
@@ -262,7 +288,7 @@ class ClipboardHistoryWidget(QWidget):
             self.category_combo.clear()
             self.category_combo.addItem('全部')
             
-            categories = self.monitor.session.query(Category).all()
+            categories = self.monitor.get_categories()
             for category in categories:
                 self.category_combo.addItem(category.name)
             
@@ -285,6 +311,7 @@ class ClipboardHistoryWidget(QWidget):
         if item:
             self.monitor.is_copying_selected = True  # 设置标记
             self.clipboard.setText(item.content)
+            self.monitor.record_copy(item_id)
             logger.info(f"已复制ID为{item_id}的内容到剪贴板")
 
     def delete_item(self, item_id):
@@ -296,13 +323,35 @@ class ClipboardHistoryWidget(QWidget):
                 if item.data(Qt.ItemDataRole.UserRole) == item_id:
                     self.history_list.takeItem(i)
                     break
+            self._show_undo()
             logger.info(f"已删除ID为{item_id}的历史记录")
         else:
             logger.warning(f"删除ID为{item_id}的记录失败")
 
+    def change_order(self, index: int):
+        # 切换排序方式并重新加载历史记录
+        self.order = self.order_combo.itemData(index)
+        self.load_history()
+
+    def toggle_semantic_search(self, checked: bool):
+        # 关闭语义搜索时列表中只有语义结果，需先重新加载完整历史再按关键词过滤
+        if not checked:
+            self.load_history()
+        self.filter_history(self.search_box.text())
+
     def filter_history(self, text: str):
         # 根据搜索文本过滤历史记录
         logger.info(f"根据关键词过滤历史记录: {text}")
+        if self.semantic_check.isChecked():
+            # 语义搜索覆盖全部历史，结果按相似度排列
+            if not text.strip():
+                self.load_history()
+                return
+            self.history_list.clear()
+            for item in self.monitor.semantic_search(text):
+                self._add_history_item(item)
+            return
+
         for i in range(self.history_list.count()):
             item = self.history_list.item(i)
             widget = self.history_list.itemWidget(item)
@@ -336,12 +385,7 @@ class ClipboardHistoryWidget(QWidget):
     def pin_item(self, item_id):
         # 置顶或取消置顶选中的记录
         # 更新置顶状态和最后访问时间
-        item = self.monitor.session.query(ClipboardItem).get(item_id)
-        if item:
-            item.is_pinned = not item.is_pinned
-            item.last_accessed = datetime.now()
-            self.monitor.session.commit()
-            logger.info(f"{'置顶' if item.is_pinned else '取消置顶'}记录: {item_id}")
+        if self.monitor.toggle_pin(item_id) is not None:
             # 重新加载列表以更新显示顺序
             self.load_history()
 
@@ -351,11 +395,24 @@ class ClipboardHistoryWidget(QWidget):
         reply = QMessageBox.question(
             self,
             '确认清除',
-            '确定要清除所有历史记录吗？此操作不可恢复。',
+            f'确定要清除所有历史记录吗？清除后 {UNDO_WINDOW_SECONDS} 秒内可撤销。',
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
             QMessageBox.StandardButton.No
         )
         
         if reply == QMessageBox.StandardButton.Yes:
             self.monitor.clear_all_history()
-            self.load_history()  # 刷新列表显示
\ No newline at end of file
+            self.load_history()  # 刷新列表显示
+            self._show_undo()
+
+    def _show_undo(self):
+        # 显示撤销按钮，超过撤销时限后自动隐藏
+        self.undo_btn.show()
+        self.undo_timer.start(UNDO_WINDOW_SECONDS * 1000)
+
+    def undo_delete(self):
+        # 撤销最近一次删除并刷新列表
+        self.undo_timer.stop()
+        self.undo_btn.hide()
+        if self.monitor.undo_delete():
+            self.load_history()
\ No newline at end of file
@@ -0,0 +1,55 @@
+import queue
+import threading
+from datetime import datetime
+
+from loguru import logger
+
+from profiler import PROFILER
+from storage import StorageBackend
+
+_STOP = object()
+
+
+class UsageRecorder(threading.Thread):
+    """后台写入使用事件的线程，复制操作只需入队，不等待数据库写入
+
+    队列中积压的事件会合并为一批，在一个事务中写入事件表并累加汇总计数。
+    """
+
+    def __init__(self, storage: StorageBackend, batch_size: int = 500):
+        super().__init__(name='UsageRecorder', daemon=True)
+        self.storage = storage
+        self.batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue()
+
+    def record(self, item_id: int, device_id: str):
+        """记录一次复用，立即返回"""
+        self._queue.put((item_id, device_id, datetime.now()))
+
+    def stop(self):
+        """写完已入队的事件后停止线程"""
+        if self.is_alive():
+            self._queue.put(_STOP)
+            self.join(timeout=5)
+
+    def run(self):
+        logger.info("使用记录线程已启动")
+        stopping = False
+        while not stopping:
+            events = [self._queue.get()]
+            # 合并已积压的事件
+            while len(events) < self.batch_size:
+                try:
+                    events.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in events:
+                stopping = True
+                events = [event for event in events if event is not _STOP]
+            if not events:
+                continue
+            try:
+                with PROFILER.thread_scope():
+                    self.storage.record_usage(events)
+            except Exception as e:
+                logger.error(f"写入使用记录时出错: {str(e)}")